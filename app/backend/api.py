@@ -1,25 +1,39 @@
 from __future__ import annotations
 
 import io
+import json
 import subprocess
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
     sys.path.append(str(ROOT_DIR))
 
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.backend import services
+from app.backend.parse_cache import get_parse_cache, parse_cache_key
 from codegen.runtime_execution import RuntimeProjectManager
-from ingestion.chunker import chunk_requirements
-from ingestion.loader import load_requirements
+from ingestion.chunker import CHUNK_MAX_TOKENS, chunk_requirements, chunking_report, iter_chunks
+from ingestion.loader import SUPPORTED_FILE_TYPES, file_type_of, iter_requirements, load_requirements
+from llms.env import env_flag
 
-app = FastAPI(title="Jira Automation API")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Warm the embedding model off the request path so the first story generation is not a cold start.
+    if env_flag("EMBEDDER_WARMUP", True):
+        services.warm_embedding_model()
+    yield
+
+
+app = FastAPI(title="Jira Automation API", lifespan=lifespan)
 runtime_manager = RuntimeProjectManager()
 
 app.add_middleware(
@@ -39,6 +53,7 @@ class RegenerateEpicRequest(BaseModel):
     source: str
     epic_name: str
     previous_description: str = ""
+    use_cache: bool = False
 
 
 class EpicStoriesRequest(BaseModel):
@@ -47,6 +62,12 @@ class EpicStoriesRequest(BaseModel):
     top_k: int = 4
 
 
+class BulkStoriesRequest(BaseModel):
+    epics: list[dict]
+    chunks: list[dict]
+    top_k: int = 4
+
+
 class StoryRequest(BaseModel):
     story: dict
 
@@ -54,12 +75,14 @@ class StoryRequest(BaseModel):
 class RegenerateStoryRequest(BaseModel):
     story: dict
     source: str
+    use_cache: bool = False
 
 
 class CodeGenerationRequest(BaseModel):
     story: dict
     stack: str
     project_config: dict = Field(default_factory=dict)
+    use_cache: bool = False
 
 
 class StoryDeliverablesRequest(BaseModel):
@@ -132,21 +155,93 @@ class WorkspaceSaveRequest(BaseModel):
     selected_file_path: str = ""
 
 
-@app.post("/requirements/parse")
-async def parse_requirements(file: UploadFile = File(...)) -> dict:
+def _csv_columns(columns: str) -> list[str]:
+    return [name.strip() for name in columns.split(",") if name.strip()]
+
+
+def _chunk_stats(requirements_text: str, chunks: list[dict], max_tokens: int) -> dict:
+    stats = chunking_report(chunks)
+    if max_tokens > 0:
+        stats["line_mode"] = chunking_report(chunk_requirements(requirements_text, max_tokens=0))
+    return stats
+
+
+def _parse_upload(file_content: bytes, filename: str, columns: list[str], max_tokens: int) -> tuple[dict, str]:
+    cache = get_parse_cache()
+    cache_key = parse_cache_key(file_content, filename, columns, max_tokens)
+    cached = cache.get(cache_key) if cache is not None else None
+    if cached is not None:
+        return cached, "hit"
+
     try:
-        file_content = await file.read()
         in_memory_file = io.BytesIO(file_content)
-        in_memory_file.name = file.filename or "requirements.txt"
-        requirements_text = load_requirements(in_memory_file)
+        in_memory_file.name = filename
+        requirements_text = load_requirements(in_memory_file, columns=columns)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    return {
-        "filename": file.filename,
+    chunks = chunk_requirements(requirements_text, max_tokens=max_tokens)
+    parsed = {
         "requirements_text": requirements_text,
-        "chunks": chunk_requirements(requirements_text),
+        "chunks": chunks,
+        "chunk_stats": _chunk_stats(requirements_text, chunks, max_tokens),
     }
+    if cache is None:
+        return parsed, "disabled"
+    cache.put(cache_key, parsed)
+    return parsed, "miss"
+
+
+@app.post("/requirements/parse")
+async def parse_requirements(
+    file: UploadFile = File(...),
+    columns: str = Form(""),
+    max_tokens: int = Form(CHUNK_MAX_TOKENS),
+) -> dict:
+    file_content = await file.read()
+    parsed, cache_status = await run_in_threadpool(
+        _parse_upload, file_content, file.filename or "requirements.txt", _csv_columns(columns), max_tokens
+    )
+    return {"filename": file.filename, **parsed, "cache": cache_status}
+
+
+@app.get("/requirements/parse/cache")
+def parse_cache_stats() -> dict:
+    cache = get_parse_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+def _ndjson_chunks(upload, filename: str, columns: list[str], max_tokens: int):
+    chunk_count = 0
+    try:
+        upload.seek(0)
+        segments = iter_requirements(upload, columns=columns, filename=filename)
+        for chunk in iter_chunks(segments, max_tokens=max_tokens):
+            chunk_count += 1
+            yield json.dumps({"type": "chunk", "chunk": chunk}) + "\n"
+        yield json.dumps({"type": "done", "filename": filename, "chunk_count": chunk_count}) + "\n"
+    except Exception as exc:  # noqa: BLE001 - the response has started; report the failure in-band
+        yield json.dumps({"type": "error", "detail": str(exc), "chunk_count": chunk_count}) + "\n"
+
+
+@app.post("/requirements/parse/stream")
+async def parse_requirements_stream(
+    file: UploadFile = File(...),
+    columns: str = Form(""),
+    max_tokens: int = Form(CHUNK_MAX_TOKENS),
+) -> StreamingResponse:
+    """Stream chunks as NDJSON while the upload is parsed in a worker thread."""
+    filename = file.filename or "requirements.txt"
+    if file_type_of(filename) not in SUPPORTED_FILE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file format")
+
+    # Parse straight from Starlette's spooled upload, which stays open until the response has been
+    # sent (or abandoned) and is closed by the framework. StreamingResponse iterates this sync
+    # generator in the threadpool, keeping parsing off the event loop.
+    return StreamingResponse(
+        _ndjson_chunks(file.file, filename, _csv_columns(columns), max_tokens),
+        media_type="application/x-ndjson",
+    )
 
 
 @app.post("/epics/generate")
@@ -154,12 +249,33 @@ def generate_epics(payload: ChunksRequest) -> dict:
     return {"epics": services.generate_epics(payload.chunks)}
 
 
+def _sse_event(event: dict) -> str:
+    payload = {key: value for key, value in event.items() if key != "event"}
+    return f"event: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+
+
+@app.post("/epics/generate/stream")
+async def generate_epics_stream(payload: ChunksRequest) -> StreamingResponse:
+    """Server-sent events: epics per chunk as each finishes, then the merged plan in a "done" event."""
+
+    async def events():
+        async for event in services.stream_epics(payload.chunks):
+            yield _sse_event(event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/epics/regenerate")
 def regenerate_epic(payload: RegenerateEpicRequest) -> dict:
     return services.regenerate_epic_details(
         payload.source,
         payload.epic_name,
         previous_description=payload.previous_description,
+        use_cache=payload.use_cache,
     )
 
 
@@ -168,9 +284,14 @@ def generate_stories(payload: EpicStoriesRequest) -> dict:
     return {"stories": services.generate_stories_for_epic(payload.epic, payload.chunks, payload.top_k)}
 
 
+@app.post("/stories/generate-bulk")
+def generate_stories_bulk(payload: BulkStoriesRequest) -> dict:
+    return {"results": services.generate_stories_for_epics(payload.epics, payload.chunks, payload.top_k)}
+
+
 @app.post("/stories/regenerate")
 def regenerate_story(payload: RegenerateStoryRequest) -> dict:
-    return services.regenerate_story_details(payload.story, payload.source)
+    return services.regenerate_story_details(payload.story, payload.source, use_cache=payload.use_cache)
 
 
 @app.post("/stories/check-duplicates")
@@ -180,7 +301,14 @@ def check_duplicates(payload: StoryRequest) -> dict:
 
 @app.post("/stories/generate-code")
 def generate_code(payload: CodeGenerationRequest) -> dict:
-    return {"files": services.generate_story_code(payload.story, payload.stack, payload.project_config)}
+    return {
+        "files": services.generate_story_code(
+            payload.story,
+            payload.stack,
+            payload.project_config,
+            use_cache=payload.use_cache,
+        )
+    }
 
 
 @app.post("/stories/generate-deliverables")
@@ -198,6 +326,44 @@ def generate_tests(payload: TestGenerationRequest) -> dict:
     return services.generate_story_tests(payload.story, payload.existing_code, payload.stack, payload.project_config)
 
 
+# Async variants: Groq calls run on the event loop, so in-flight LLM calls are not capped by the threadpool size.
+@app.post("/async/epics/generate")
+async def generate_epics_async(payload: ChunksRequest) -> dict:
+    return {"epics": await services.generate_epics_async(payload.chunks)}
+
+
+@app.post("/async/stories/generate")
+async def generate_stories_async(payload: EpicStoriesRequest) -> dict:
+    return {"stories": await services.generate_stories_for_epic_async(payload.epic, payload.chunks, payload.top_k)}
+
+
+@app.post("/async/stories/generate-bulk")
+async def generate_stories_bulk_async(payload: BulkStoriesRequest) -> dict:
+    return {"results": await services.generate_stories_for_epics_async(payload.epics, payload.chunks, payload.top_k)}
+
+
+@app.post("/async/stories/generate-code")
+async def generate_code_async(payload: CodeGenerationRequest) -> dict:
+    return {
+        "files": await services.generate_story_code_async(
+            payload.story,
+            payload.stack,
+            payload.project_config,
+            use_cache=payload.use_cache,
+        )
+    }
+
+
+@app.post("/async/stories/generate-tests")
+async def generate_tests_async(payload: TestGenerationRequest) -> dict:
+    return await services.generate_story_tests_async(
+        payload.story,
+        payload.existing_code,
+        payload.stack,
+        payload.project_config,
+    )
+
+
 @app.post("/project/send-notification")
 def send_project_notification(payload: ProjectNotificationRequest) -> dict:
     return {
@@ -291,6 +457,35 @@ def save_workspace(payload: WorkspaceSaveRequest) -> dict:
     return services.save_workspace_snapshot(payload.model_dump())
 
 
+@app.post("/workspaces/{workspace_id}/diff")
+async def diff_workspace_requirements(
+    workspace_id: str,
+    file: UploadFile = File(...),
+    columns: str = Form(""),
+    max_tokens: int = Form(CHUNK_MAX_TOKENS),
+    regenerate: bool = Form(True),
+    save: bool = Form(False),
+) -> dict:
+    """Diff an updated spec against a saved workspace and regenerate only the affected epics and stories."""
+    file_content = await file.read()
+    parsed, _ = await run_in_threadpool(
+        _parse_upload, file_content, file.filename or "requirements.txt", _csv_columns(columns), max_tokens
+    )
+    try:
+        return await run_in_threadpool(
+            services.rebuild_workspace_plan,
+            workspace_id,
+            parsed["chunks"],
+            regenerate=regenerate,
+            save=save,
+            requirements_filename=file.filename or "",
+        )
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
 @app.get("/workspaces/{workspace_id}")
 def load_workspace(workspace_id: str) -> dict:
     try:
@@ -316,6 +511,21 @@ def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/llm/stats")
+def llm_stats() -> dict:
+    return services.get_llm_stats()
+
+
+@app.get("/health/ready")
+def health_ready() -> JSONResponse:
+    embedder = services.get_embedding_readiness()
+    ready = bool(embedder.get("ready"))
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "embedder": embedder},
+    )
+
+
 @app.get("/generated-demo", response_class=HTMLResponse)
 def generated_demo() -> HTMLResponse:
     return HTMLResponse(content=services.get_local_demo_html())
@@ -5,12 +5,7 @@ import smtplib
 from email.message import EmailMessage
 from typing import Any
 
-
-def _env_flag(name: str, default: bool = False) -> bool:
-    value = str(os.getenv(name, "")).strip().lower()
-    if not value:
-        return default
-    return value in {"1", "true", "yes", "on"}
+from llms.env import env_flag
 
 
 def _completed_story_lines(stories: list[dict[str, Any]]) -> list[str]:
@@ -64,7 +59,7 @@ def send_project_completion_email(
     smtp_username = str(os.getenv("SMTP_USERNAME") or "").strip()
     smtp_password = str(os.getenv("SMTP_PASSWORD") or "").strip()
     smtp_from = str(os.getenv("SMTP_FROM_EMAIL") or smtp_username or "no-reply@localhost").strip()
-    use_tls = _env_flag("SMTP_USE_TLS", default=True)
+    use_tls = env_flag("SMTP_USE_TLS", default=True)
 
     subject, body = build_project_completion_email(epics)
 
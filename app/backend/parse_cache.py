@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from llms.env import env_flag
+
+
+PARSE_CACHE_DIR = Path(os.getenv("PARSE_CACHE_DIR") or (Path.cwd() / ".parse_cache"))
+PARSE_CACHE_MAX_ENTRIES = int(os.getenv("PARSE_CACHE_MAX_ENTRIES", "64"))
+# Bump when the parse or chunk output format changes so stale entries stop matching.
+PARSE_CACHE_VERSION = "1"
+
+
+def parse_cache_key(content: bytes, filename: str, columns: list[str], max_tokens: int) -> str:
+    """SHA-256 of the raw upload bytes plus every setting that changes the parse output."""
+    digest = hashlib.sha256(content)
+    settings = {
+        "version": PARSE_CACHE_VERSION,
+        "file_type": filename.rsplit(".", 1)[-1].lower(),
+        "columns": columns,
+        "max_tokens": max_tokens,
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    Bounded on-disk cache of parse results, one JSON file per content key.
+
+    Entries are written atomically and touched on every hit; once the cache holds
+    more than `max_entries` files the least recently used ones are removed.
+    """
+
+    def __init__(self, root: Path, max_entries: int = PARSE_CACHE_MAX_ENTRIES):
+        self.root = Path(root)
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        path = self._path(key)
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)
+        except (OSError, ValueError):
+            payload = None
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return payload
+
+    def put(self, key: str, payload: dict[str, Any]) -> None:
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+    def _entries(self) -> list[Path]:
+        try:
+            return list(self.root.glob("*.json"))
+        except OSError:
+            return []
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        if len(entries) <= self.max_entries:
+            return
+        by_age = []
+        for path in entries:
+            try:
+                by_age.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        by_age.sort()
+        for _, path in by_age[: len(by_age) - self.max_entries]:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "enabled": True,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries()),
+            "max_entries": self.max_entries,
+        }
+
+
+_cache: ParseCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache | None:
+    """Process-wide cache, or None when PARSE_CACHE_ENABLED is off."""
+    global _cache
+    if not env_flag("PARSE_CACHE_ENABLED", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache(PARSE_CACHE_DIR)
+        return _cache
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import sys
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
@@ -14,8 +15,10 @@ from app.backend.emailer import send_project_completion_email
 from codegen.code_generator import (
     build_project_preview,
     generate_code_for_story,
+    generate_code_for_story_async,
     generate_story_deliverables,
     generate_tests_for_story,
+    generate_tests_for_story_async,
     normalize_project_config,
     run_project_unit_tests,
 )
@@ -29,10 +32,19 @@ from jira_integration.jira_client import (
 )
 from jira_integration.story_creator import _normalize_summary, create_jira_stories
 from llms.epic_llm import regenerate_epic
-from llms.epic_pipeline import generate_epics_from_requirements
+from llms.epic_pipeline import (
+    generate_epics_from_requirements,
+    generate_epics_from_requirements_async,
+    iter_chunk_epics_async,
+)
+from llms.epic_reducer import merge_and_dedupe_epics
+from llms.json_repair import repair_stats
 from llms.reducer import merge_and_dedupe
-from llms.story_llm import generate_stories_from_chunk, regenerate_story
-from rag.retriever import retrieve_top_k
+from llms.response_cache import get_response_cache
+from llms.single_flight import llm_async_flights, llm_flights
+from llms.story_llm import generate_stories_from_chunk, generate_stories_from_chunk_async, regenerate_story
+from rag.embeddings import embedder_status, warm_embedder_async
+from rag.retriever import retrieve_top_k, retrieve_top_k_batch
 from app.backend.workspace_store import load_workspace, save_workspace, list_workspaces
 
 _LOCAL_DEMO_STATE: dict[str, Any] = {
@@ -66,39 +78,138 @@ def generate_epics(chunks: list[dict]) -> list[dict]:
     return [_normalize_epic_for_jira(epic) for epic in generate_epics_from_requirements(chunks)]
 
 
-def _select_story_chunks(epic: dict, chunks: list[dict], top_k: int = 4) -> list[dict]:
-    if not chunks:
-        return []
-
-    chunk_lookup = {chunk.get("chunk_id"): chunk for chunk in chunks}
+def _source_chunks(epic: dict, chunk_lookup: dict) -> list[dict]:
     ordered_source_ids = []
     for chunk_id in epic.get("source_chunk_ids", []) or []:
         if chunk_id in chunk_lookup and chunk_id not in ordered_source_ids:
             ordered_source_ids.append(chunk_id)
+    return [chunk_lookup[chunk_id] for chunk_id in ordered_source_ids]
+
 
-    if ordered_source_ids:
-        return [chunk_lookup[chunk_id] for chunk_id in ordered_source_ids]
+def _epic_query(epic: dict) -> str:
+    return " ".join(part for part in (epic.get("epic_name", ""), epic.get("summary", "")) if part).strip()
 
-    retrieved = retrieve_top_k(chunks, epic["epic_name"], k=top_k)
+
+def _in_source_order(retrieved: list[dict], chunks: list[dict]) -> list[dict]:
     retrieved_ids = {chunk.get("chunk_id") for chunk in retrieved}
     ordered_retrieved = [chunk for chunk in chunks if chunk.get("chunk_id") in retrieved_ids]
     return ordered_retrieved or retrieved
 
 
-def regenerate_epic_details(source: str, epic_name: str, previous_description: str = "") -> dict:
-    return regenerate_epic(source, epic_name, previous_description=previous_description)
+def _select_story_chunks(epic: dict, chunks: list[dict], top_k: int = 4) -> list[dict]:
+    if not chunks:
+        return []
 
+    source_chunks = _source_chunks(epic, {chunk.get("chunk_id"): chunk for chunk in chunks})
+    if source_chunks:
+        return source_chunks
 
-def generate_stories_for_epic(epic: dict, chunks: list[dict], top_k: int = 4) -> list[dict]:
-    epic_chunks = _select_story_chunks(epic, chunks, top_k=top_k)
+    return _in_source_order(retrieve_top_k(chunks, _epic_query(epic), k=top_k), chunks)
+
+
+def select_story_chunks_for_epics(epics: list[dict], chunks: list[dict], top_k: int = 4) -> list[list[dict]]:
+    """Chunk selection for many epics; epics without source chunks share one batched retrieval."""
+    if not chunks:
+        return [[] for _ in epics]
+
+    chunk_lookup = {chunk.get("chunk_id"): chunk for chunk in chunks}
+    selected = [_source_chunks(epic, chunk_lookup) for epic in epics]
+    pending = [index for index, epic_chunks in enumerate(selected) if not epic_chunks]
+    if pending:
+        retrieved = retrieve_top_k_batch(chunks, [_epic_query(epics[index]) for index in pending], k=top_k)
+        for index, epic_chunks in zip(pending, retrieved):
+            selected[index] = _in_source_order(epic_chunks, chunks)
+    return selected
+
+
+def regenerate_epic_details(
+    source: str,
+    epic_name: str,
+    previous_description: str = "",
+    use_cache: bool = False,
+) -> dict:
+    return regenerate_epic(source, epic_name, previous_description=previous_description, use_cache=use_cache)
+
+
+def _generate_stories_from_chunks(epic: dict, epic_chunks: list[dict]) -> list[dict]:
     stories = []
     for chunk in epic_chunks:
         stories.extend(generate_stories_from_chunk(epic, chunk))
     return [_normalize_story_for_jira(story) for story in merge_and_dedupe(stories)]
 
 
-def regenerate_story_details(story: dict, source: str) -> dict:
-    return _normalize_story_for_jira(regenerate_story(story, source))
+def generate_stories_for_epic(epic: dict, chunks: list[dict], top_k: int = 4) -> list[dict]:
+    return _generate_stories_from_chunks(epic, _select_story_chunks(epic, chunks, top_k=top_k))
+
+
+def generate_stories_for_epics(epics: list[dict], chunks: list[dict], top_k: int = 4) -> list[dict]:
+    selected = select_story_chunks_for_epics(epics, chunks, top_k=top_k)
+    return [
+        {"epic_name": epic.get("epic_name", ""), "stories": _generate_stories_from_chunks(epic, epic_chunks)}
+        for epic, epic_chunks in zip(epics, selected)
+    ]
+
+
+async def generate_epics_async(chunks: list[dict]) -> list[dict]:
+    return [_normalize_epic_for_jira(epic) for epic in await generate_epics_from_requirements_async(chunks)]
+
+
+async def stream_epics(chunks: list[dict]) -> AsyncIterator[dict[str, Any]]:
+    """
+    Epic generation progress events: one "chunk" (or "error") event per chunk as it
+    completes, then "done" with the merged plan, identical to `generate_epics`.
+    """
+    per_chunk: list[list[dict]] = [[] for _ in chunks]
+    failed_chunk_ids = []
+    completed = 0
+    async for index, epics, error in iter_chunk_epics_async(chunks):
+        completed += 1
+        chunk_id = chunks[index].get("chunk_id", "")
+        if error is not None:
+            failed_chunk_ids.append(chunk_id)
+            yield {"event": "error", "chunk_id": chunk_id, "index": index, "detail": str(error)}
+            continue
+        per_chunk[index] = epics
+        yield {
+            "event": "chunk",
+            "chunk_id": chunk_id,
+            "index": index,
+            "epics": [_normalize_epic_for_jira(epic) for epic in epics],
+            "completed": completed,
+            "total": len(chunks),
+        }
+
+    # merge in source order so the final plan matches the non-streaming endpoint
+    merged = merge_and_dedupe_epics([epic for epics in per_chunk for epic in epics])
+    yield {
+        "event": "done",
+        "epics": [_normalize_epic_for_jira(epic) for epic in merged],
+        "failed_chunk_ids": failed_chunk_ids,
+    }
+
+
+async def _generate_stories_from_chunks_async(epic: dict, epic_chunks: list[dict]) -> list[dict]:
+    per_chunk = await asyncio.gather(*(generate_stories_from_chunk_async(epic, chunk) for chunk in epic_chunks))
+    stories = [story for chunk_stories in per_chunk for story in chunk_stories]
+    return [_normalize_story_for_jira(story) for story in merge_and_dedupe(stories)]
+
+
+async def generate_stories_for_epic_async(epic: dict, chunks: list[dict], top_k: int = 4) -> list[dict]:
+    # retrieval embeds text on the CPU, so it runs in a worker thread
+    epic_chunks = await asyncio.to_thread(_select_story_chunks, epic, chunks, top_k)
+    return await _generate_stories_from_chunks_async(epic, epic_chunks)
+
+
+async def generate_stories_for_epics_async(epics: list[dict], chunks: list[dict], top_k: int = 4) -> list[dict]:
+    selected = await asyncio.to_thread(select_story_chunks_for_epics, epics, chunks, top_k)
+    per_epic = await asyncio.gather(
+        *(_generate_stories_from_chunks_async(epic, epic_chunks) for epic, epic_chunks in zip(epics, selected))
+    )
+    return [{"epic_name": epic.get("epic_name", ""), "stories": stories} for epic, stories in zip(epics, per_epic)]
+
+
+def regenerate_story_details(story: dict, source: str, use_cache: bool = False) -> dict:
+    return _normalize_story_for_jira(regenerate_story(story, source, use_cache=use_cache))
 
 
 def check_story_duplicates(story: dict) -> list[dict]:
@@ -109,8 +220,18 @@ def generate_story_code(
     story: dict,
     stack: str,
     project_config: dict[str, Any] | None = None,
+    use_cache: bool = False,
 ) -> dict[str, str]:
-    return generate_code_for_story(story, stack, project_config=project_config)
+    return generate_code_for_story(story, stack, project_config=project_config, use_cache=use_cache)
+
+
+async def generate_story_code_async(
+    story: dict,
+    stack: str,
+    project_config: dict[str, Any] | None = None,
+    use_cache: bool = False,
+) -> dict[str, str]:
+    return await generate_code_for_story_async(story, stack, project_config=project_config, use_cache=use_cache)
 
 
 def _resolve_project_config(stack: str = "", project_config: dict[str, Any] | None = None) -> dict[str, str]:
@@ -213,6 +334,15 @@ def generate_story_tests(
     return generate_tests_for_story(story, existing_code, stack, project_config)
 
 
+async def generate_story_tests_async(
+    story: dict,
+    existing_code: str = "",
+    stack: str = "",
+    project_config: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    return await generate_tests_for_story_async(story, existing_code, stack, project_config)
+
+
 def send_project_notification(
     epics: list[dict[str, Any]],
     notification_email: str = "",
@@ -300,6 +430,24 @@ def preview_generated_project(files: dict[str, str], selected_language: str) ->
     }
 
 
+def warm_embedding_model() -> None:
+    warm_embedder_async()
+
+
+def get_embedding_readiness() -> dict[str, Any]:
+    return embedder_status()
+
+
+def get_llm_stats() -> dict[str, Any]:
+    cache = get_response_cache()
+    return {
+        "json_repair": repair_stats(),
+        "response_cache": cache.stats() if cache is not None else {"enabled": False},
+        "single_flight": llm_flights.stats(),
+        "async_single_flight": llm_async_flights.stats(),
+    }
+
+
 def auto_configure_jira() -> dict[str, str | None]:
     return {
         "jira_url": os.getenv("JIRA_URL"),
@@ -335,3 +483,95 @@ def list_saved_workspaces() -> list[dict[str, Any]]:
 
 def load_workspace_snapshot(workspace_id: str) -> dict[str, Any]:
     return load_workspace(workspace_id)
+
+
+def diff_chunks(previous_chunks: list[dict], chunks: list[dict]) -> dict[str, list[str]]:
+    """Added and removed chunk ids; ids are content hashes, so an edited chunk shows up as one of each."""
+    previous_ids = {chunk.get("chunk_id") for chunk in previous_chunks}
+    current_ids = {chunk.get("chunk_id") for chunk in chunks}
+    return {
+        "added_chunk_ids": [chunk["chunk_id"] for chunk in chunks if chunk.get("chunk_id") not in previous_ids],
+        "removed_chunk_ids": [
+            chunk["chunk_id"] for chunk in previous_chunks if chunk.get("chunk_id") not in current_ids
+        ],
+    }
+
+
+def _prune_epic(epic: dict, removed_ids: set[str]) -> dict | None:
+    source_ids = epic.get("source_chunk_ids", []) or []
+    kept_ids = [chunk_id for chunk_id in source_ids if chunk_id not in removed_ids]
+    if source_ids and not kept_ids:
+        return None
+
+    pruned = dict(epic)
+    pruned["source_chunk_ids"] = kept_ids
+    pruned["stories"] = [
+        story for story in epic.get("stories", []) or [] if story.get("source_chunk_id") not in removed_ids
+    ]
+    return pruned
+
+
+def rebuild_workspace_plan(
+    workspace_id: str,
+    chunks: list[dict],
+    regenerate: bool = True,
+    save: bool = False,
+    requirements_filename: str = "",
+) -> dict[str, Any]:
+    """
+    Re-ingest a changed spec into a saved workspace.
+
+    Epics and stories are generated for added chunks only and merged into the
+    saved plan; stories sourced from removed chunks are dropped, as are epics
+    whose every source chunk was removed.
+    """
+    snapshot = load_workspace(workspace_id)
+    diff = diff_chunks(snapshot.get("chunks", []) or [], chunks)
+    result: dict[str, Any] = {
+        "workspace_id": snapshot["workspace_id"],
+        **diff,
+        "unchanged_chunk_count": len(chunks) - len(diff["added_chunk_ids"]),
+    }
+    if not regenerate:
+        return result
+
+    removed_ids = set(diff["removed_chunk_ids"])
+    kept_epics, removed_epics, pruned_epics = [], [], set()
+    for epic in snapshot.get("epics", []) or []:
+        pruned = _prune_epic(epic, removed_ids)
+        if pruned is None:
+            removed_epics.append(epic.get("epic_name", ""))
+            continue
+        if pruned["source_chunk_ids"] != (epic.get("source_chunk_ids") or []):
+            pruned_epics.add(id(pruned))
+        kept_epics.append(pruned)
+
+    added_ids = set(diff["added_chunk_ids"])
+    added_chunks = [chunk for chunk in chunks if chunk.get("chunk_id") in added_ids]
+    new_epics = generate_epics(added_chunks) if added_chunks else []
+    # Saved epics come first, so they keep their position and stories when a new epic merges into them.
+    epics = merge_and_dedupe_epics(kept_epics + new_epics)
+
+    affected_epics = []
+    for epic in epics:
+        epic.setdefault("stories", [])
+        source_ids = set(epic.get("source_chunk_ids") or [])
+        epic_added_chunks = [chunk for chunk in added_chunks if chunk["chunk_id"] in source_ids]
+        if epic_added_chunks:
+            stories = epic["stories"] + _generate_stories_from_chunks(epic, epic_added_chunks)
+            epic["stories"] = [_normalize_story_for_jira(story) for story in merge_and_dedupe(stories)]
+        if epic_added_chunks or id(epic) in pruned_epics:
+            affected_epics.append(epic.get("epic_name", ""))
+
+    result.update({
+        "chunks": chunks,
+        "epics": epics,
+        "affected_epics": affected_epics,
+        "removed_epics": removed_epics,
+    })
+    if save:
+        snapshot.update({"chunks": chunks, "epics": epics})
+        if requirements_filename:
+            snapshot["requirements_filename"] = requirements_filename
+        result["workspace"] = save_workspace(snapshot)
+    return result
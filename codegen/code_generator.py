@@ -5,17 +5,22 @@ import os
 import subprocess
 import sys
 import tempfile
-from typing import Any
+from typing import Any, Callable
 from pathlib import Path
 
 from dotenv import load_dotenv
-from groq import BadRequestError, Groq
+from groq import BadRequestError
 
+from llms.groq_client import LazyClient, get_async_client
+from llms.json_repair import escape_control_chars_in_strings, record_llm_fallback
 from llms.parser import parse_llm_json
+from llms.response_cache import cached_completion, cached_completion_async, response_cache_key
+from llms.scheduler import run_scheduled, run_scheduled_async
+from llms.single_flight import llm_async_flights, llm_flights
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+client = LazyClient()
 
 FRONTEND_STACKS = {
     "react_vite": {
@@ -98,6 +103,7 @@ TEST_CATEGORY_HINTS = [
 
 CODEGEN_MODEL = os.getenv("CODEGEN_MODEL", "llama-3.3-70b-versatile")
 MAX_PARSE_RETRIES = 2
+CODEGEN_SYSTEM_PROMPT = "You output strict JSON only."
 JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
 ROUTE_PATTERN = re.compile(r'@(app|router)\.(get|post|put|delete|patch)\(["\']([^"\']+)["\']')
 EXPRESS_ROUTE_PATTERN = re.compile(r"\b(app|router)\.(get|post|put|delete|patch)\(\s*['\"]([^'\"]+)['\"]")
@@ -694,26 +700,87 @@ Return this exact schema:
 """.strip()
 
 
-def _invoke_code_model(prompt: str) -> str:
+def _code_model_kwargs(prompt: str) -> dict[str, Any]:
+    return {
+        "model": CODEGEN_MODEL,
+        "messages": [
+            {"role": "system", "content": CODEGEN_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.15,
+        "response_format": {"type": "json_object"},
+    }
+
+
+def _code_model_params() -> dict[str, Any]:
+    return {"system": CODEGEN_SYSTEM_PROMPT, "temperature": 0.15, "json_mode": True}
+
+
+def _failed_generation(exc: BadRequestError) -> str:
+    body = getattr(exc, "body", None)
+    if isinstance(body, dict):
+        error = body.get("error", {})
+        if error.get("code") == "json_validate_failed":
+            return str(error.get("failed_generation", "") or "").strip()
+    return ""
+
+
+def _invoke_code_model(prompt: str, use_cache: bool = False, validate: Callable[[str], Any] | None = None) -> str:
+    params = _code_model_params()
+    key = response_cache_key(CODEGEN_MODEL, prompt, params)
+    if not use_cache:
+        return llm_flights.do(key, lambda: _request_code_model(prompt))
+    return llm_flights.do(
+        f"cached:{key}",
+        lambda: cached_completion(CODEGEN_MODEL, prompt, params, lambda: _request_code_model(prompt), validate=validate),
+    )
+
+
+def _request_code_model(prompt: str) -> str:
     try:
-        response = client.chat.completions.create(
-            model=CODEGEN_MODEL,
-            messages=[
-                {"role": "system", "content": "You output strict JSON only."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.15,
-            response_format={"type": "json_object"},
+        response = run_scheduled(
+            CODEGEN_MODEL,
+            prompt,
+            lambda: client.chat.completions.create(**_code_model_kwargs(prompt)),
         )
         return (response.choices[0].message.content or "").strip()
     except BadRequestError as exc:
-        body = getattr(exc, "body", None)
-        if isinstance(body, dict):
-            error = body.get("error", {})
-            if error.get("code") == "json_validate_failed":
-                failed_generation = error.get("failed_generation", "")
-                if failed_generation:
-                    return str(failed_generation).strip()
+        failed_generation = _failed_generation(exc)
+        if failed_generation:
+            return failed_generation
+        raise
+
+
+async def _invoke_code_model_async(
+    prompt: str,
+    use_cache: bool = False,
+    validate: Callable[[str], Any] | None = None,
+) -> str:
+    params = _code_model_params()
+    key = response_cache_key(CODEGEN_MODEL, prompt, params)
+    if not use_cache:
+        return await llm_async_flights.do(key, lambda: _request_code_model_async(prompt))
+    return await llm_async_flights.do(
+        f"cached:{key}",
+        lambda: cached_completion_async(
+            CODEGEN_MODEL, prompt, params, lambda: _request_code_model_async(prompt), validate=validate
+        ),
+    )
+
+
+async def _request_code_model_async(prompt: str) -> str:
+    async_client = get_async_client()
+    try:
+        response = await run_scheduled_async(
+            CODEGEN_MODEL,
+            prompt,
+            lambda: async_client.chat.completions.create(**_code_model_kwargs(prompt)),
+        )
+        return (response.choices[0].message.content or "").strip()
+    except BadRequestError as exc:
+        failed_generation = _failed_generation(exc)
+        if failed_generation:
+            return failed_generation
         raise
 
 
@@ -729,45 +796,7 @@ def _extract_json_candidate(raw_content: str) -> str:
 
 def _escape_control_chars_in_json_strings(text: str) -> str:
     """Repair common LLM JSON issues: raw newlines/tabs inside quoted strings."""
-    out: list[str] = []
-    in_string = False
-    escaped = False
-
-    for char in text:
-        if in_string:
-            if escaped:
-                out.append(char)
-                escaped = False
-                continue
-
-            if char == "\\":
-                out.append(char)
-                escaped = True
-                continue
-
-            if char == '"':
-                out.append(char)
-                in_string = False
-                continue
-
-            if char == "\n":
-                out.append("\\n")
-                continue
-            if char == "\r":
-                out.append("\\r")
-                continue
-            if char == "\t":
-                out.append("\\t")
-                continue
-
-            out.append(char)
-            continue
-
-        out.append(char)
-        if char == '"':
-            in_string = True
-
-    return "".join(out)
+    return escape_control_chars_in_strings(text)
 
 
 def _normalize_files(files_obj: Any) -> dict[str, str]:
@@ -1123,24 +1152,12 @@ def _normalize_generated_tests_for_story(
     }
 
 
-def generate_code_for_story(
+def _code_request(
     story: dict[str, Any],
     stack_key: str,
-    existing_code: dict[str, str] | str | None = None,
-    project_config: dict[str, Any] | None = None,
-) -> dict[str, str]:
-    """
-    Generates production-ready code for ONE story.
-    Returns a dict: {filepath: code}
-    """
-    if stack_key not in SUPPORTED_STACKS and stack_key not in BACKEND_STACKS and stack_key not in FRONTEND_STACKS:
-        return {
-            "ERROR.txt": (
-                f"Unsupported stack: {stack_key}. Supported backend stacks: {', '.join(BACKEND_STACKS)}. "
-                f"Supported frontend stacks: {', '.join(FRONTEND_STACKS)}."
-            ),
-        }
-
+    existing_code: dict[str, str] | str | None,
+    project_config: dict[str, Any] | None,
+) -> tuple[str, dict[str, str]]:
     resolved_config = normalize_project_config(stack_key, project_config)
     stack = _project_config_prompt(resolved_config)
     project_context = _format_project_context(existing_code)
@@ -1151,30 +1168,59 @@ def generate_code_for_story(
         project_context,
         resolved_config,
     )
+    return prompt, resolved_config
 
-    raw_content = ""
-    parse_error = ""
-    validation_issues: list[str] = []
 
-    for attempt in range(1, MAX_PARSE_RETRIES + 2):
-        raw_content = _invoke_code_model(prompt)
-        try:
-            files = _parse_code_response(raw_content)
-            validation_issues = _detect_validation_issues(story, files, resolved_config)
-            if validation_issues:
-                parse_error = "; ".join(validation_issues)
-                prompt = _build_validation_feedback(validation_issues, raw_content)
-                continue
-            return files
-        except Exception as exc:  # noqa: BLE001
-            parse_error = str(exc)
-            prompt = (
-                "Your previous answer was not parseable JSON for the required schema. "
-                "Respond again with ONLY valid JSON exactly like: "
-                '{"files": {"path/to/file.ext": "code"}}.\n\n'
-                f"Previous output:\n{raw_content}"
-            )
+def _unsupported_stack_files(stack_key: str) -> dict[str, str] | None:
+    if stack_key not in SUPPORTED_STACKS and stack_key not in BACKEND_STACKS and stack_key not in FRONTEND_STACKS:
+        return {
+            "ERROR.txt": (
+                f"Unsupported stack: {stack_key}. Supported backend stacks: {', '.join(BACKEND_STACKS)}. "
+                f"Supported frontend stacks: {', '.join(FRONTEND_STACKS)}."
+            ),
+        }
+    return None
+
 
+def _review_code_response(
+    story: dict[str, Any],
+    raw_content: str,
+    resolved_config: dict[str, str],
+    will_retry: bool = False,
+) -> tuple[dict[str, str] | None, str, str]:
+    """
+    Returns (files, "", "") for usable output, else (None, issue, retry prompt).
+
+    Unparseable output counts as an LLM repair fallback only when `will_retry`,
+    i.e. the retry prompt will actually be sent.
+    """
+    try:
+        files = _parse_code_response(raw_content)
+        validation_issues = _detect_validation_issues(story, files, resolved_config)
+        if validation_issues:
+            return None, "; ".join(validation_issues), _build_validation_feedback(validation_issues, raw_content)
+        return files, "", ""
+    except Exception as exc:  # noqa: BLE001
+        if will_retry:
+            record_llm_fallback()
+        return None, str(exc), (
+            "Your previous answer was not parseable JSON for the required schema. "
+            "Respond again with ONLY valid JSON exactly like: "
+            '{"files": {"path/to/file.ext": "code"}}.\n\n'
+            f"Previous output:\n{raw_content}"
+        )
+
+
+def _code_validator(story: dict[str, Any], resolved_config: dict[str, str]) -> Callable[[str], None]:
+    def validate(raw: str) -> None:
+        issues = _detect_validation_issues(story, _parse_code_response(raw), resolved_config)
+        if issues:
+            raise ValueError("; ".join(issues))
+
+    return validate
+
+
+def _code_failure_files(parse_error: str, raw_content: str) -> dict[str, str]:
     return {
         "ERROR.txt": (
             "Failed to produce validated model output after retries.\n"
@@ -1184,30 +1230,85 @@ def generate_code_for_story(
     }
 
 
-def generate_tests_for_story(
+def generate_code_for_story(
     story: dict[str, Any],
-    existing_code: str = "",
-    stack_key: str = "",
+    stack_key: str,
+    existing_code: dict[str, str] | str | None = None,
     project_config: dict[str, Any] | None = None,
-) -> dict[str, Any]:
-    prompt = _build_test_prompt(story, existing_code, stack_key, project_config)
+    use_cache: bool = False,
+) -> dict[str, str]:
+    """
+    Generates production-ready code for ONE story.
+    Returns a dict: {filepath: code}
+    With `use_cache`, validated responses are reused from the shared LLM response cache.
+    """
+    unsupported = _unsupported_stack_files(stack_key)
+    if unsupported:
+        return unsupported
 
+    prompt, resolved_config = _code_request(story, stack_key, existing_code, project_config)
+    validate = _code_validator(story, resolved_config)
     raw_content = ""
     parse_error = ""
 
-    for _ in range(1, MAX_PARSE_RETRIES + 2):
-        raw_content = _invoke_code_model(prompt)
-        try:
-            parsed = _parse_test_response(raw_content)
-            return _normalize_generated_tests_for_story(story, parsed)
-        except Exception as exc:  # noqa: BLE001
-            parse_error = str(exc)
-            prompt = (
-                "Your previous answer was not parseable for the required JSON schema. "
-                "Respond again with JSON ONLY and include keys: unit_test_files, manual_test_cases, automated_test_cases.\n\n"
-                f"Previous output:\n{raw_content}"
-            )
+    for attempt in range(1, MAX_PARSE_RETRIES + 2):
+        raw_content = _invoke_code_model(prompt, use_cache=use_cache, validate=validate)
+        files, parse_error, prompt = _review_code_response(
+            story, raw_content, resolved_config, will_retry=attempt <= MAX_PARSE_RETRIES
+        )
+        if files is not None:
+            return files
+
+    return _code_failure_files(parse_error, raw_content)
 
+
+async def generate_code_for_story_async(
+    story: dict[str, Any],
+    stack_key: str,
+    existing_code: dict[str, str] | str | None = None,
+    project_config: dict[str, Any] | None = None,
+    use_cache: bool = False,
+) -> dict[str, str]:
+    """Async `generate_code_for_story` on the AsyncGroq client."""
+    unsupported = _unsupported_stack_files(stack_key)
+    if unsupported:
+        return unsupported
+
+    prompt, resolved_config = _code_request(story, stack_key, existing_code, project_config)
+    validate = _code_validator(story, resolved_config)
+    raw_content = ""
+    parse_error = ""
+
+    for attempt in range(1, MAX_PARSE_RETRIES + 2):
+        raw_content = await _invoke_code_model_async(prompt, use_cache=use_cache, validate=validate)
+        files, parse_error, prompt = _review_code_response(
+            story, raw_content, resolved_config, will_retry=attempt <= MAX_PARSE_RETRIES
+        )
+        if files is not None:
+            return files
+
+    return _code_failure_files(parse_error, raw_content)
+
+
+def _review_test_response(
+    story: dict[str, Any],
+    raw_content: str,
+    will_retry: bool = False,
+) -> tuple[dict[str, Any] | None, str, str]:
+    try:
+        parsed = _parse_test_response(raw_content)
+        return _normalize_generated_tests_for_story(story, parsed), "", ""
+    except Exception as exc:  # noqa: BLE001
+        if will_retry:
+            record_llm_fallback()
+        return None, str(exc), (
+            "Your previous answer was not parseable for the required JSON schema. "
+            "Respond again with JSON ONLY and include keys: unit_test_files, manual_test_cases, automated_test_cases.\n\n"
+            f"Previous output:\n{raw_content}"
+        )
+
+
+def _test_failure_result(parse_error: str, raw_content: str) -> dict[str, Any]:
     return {
         "unit_test_files": {
             "ERROR.txt": (
@@ -1221,6 +1322,52 @@ def generate_tests_for_story(
     }
 
 
+def generate_tests_for_story(
+    story: dict[str, Any],
+    existing_code: str = "",
+    stack_key: str = "",
+    project_config: dict[str, Any] | None = None,
+    use_cache: bool = False,
+) -> dict[str, Any]:
+    prompt = _build_test_prompt(story, existing_code, stack_key, project_config)
+
+    raw_content = ""
+    parse_error = ""
+
+    for attempt in range(1, MAX_PARSE_RETRIES + 2):
+        raw_content = _invoke_code_model(prompt, use_cache=use_cache, validate=_parse_test_response)
+        result, parse_error, prompt = _review_test_response(
+            story, raw_content, will_retry=attempt <= MAX_PARSE_RETRIES
+        )
+        if result is not None:
+            return result
+
+    return _test_failure_result(parse_error, raw_content)
+
+
+async def generate_tests_for_story_async(
+    story: dict[str, Any],
+    existing_code: str = "",
+    stack_key: str = "",
+    project_config: dict[str, Any] | None = None,
+    use_cache: bool = False,
+) -> dict[str, Any]:
+    prompt = _build_test_prompt(story, existing_code, stack_key, project_config)
+
+    raw_content = ""
+    parse_error = ""
+
+    for attempt in range(1, MAX_PARSE_RETRIES + 2):
+        raw_content = await _invoke_code_model_async(prompt, use_cache=use_cache, validate=_parse_test_response)
+        result, parse_error, prompt = _review_test_response(
+            story, raw_content, will_retry=attempt <= MAX_PARSE_RETRIES
+        )
+        if result is not None:
+            return result
+
+    return _test_failure_result(parse_error, raw_content)
+
+
 def build_project_preview(files: dict[str, str], stack_key: str = "") -> dict[str, Any]:
     entrypoints = [
         path
@@ -1,10 +1,22 @@
 import hashlib
-import re
-from typing import Dict, List
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from llms.tokens import estimate_tokens
+from prompts.epic_prompts import generate_epics_prompt
+from rag.lexical import term_frequencies
+
+
+# Token budget per chunk; 0 keeps the line-count mode (and its chunk ids) as the default.
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0"))
+
+
+SEMANTIC_PREFIXES = ("epic", "module", "feature")
 
 
 def _normalize_line(line: str) -> str:
-    return re.sub(r"\s+", " ", line.strip())
+    # str.split() collapses the same unicode whitespace as re's \s without a regex per line.
+    return " ".join(line.split())
 
 
 def _line_key(line: str) -> str:
@@ -13,32 +25,81 @@ def _line_key(line: str) -> str:
     return digest
 
 
-def chunk_requirements(text: str, max_lines: int = 5) -> List[Dict[str, str]]:
-    """
-    Build small semantic chunks with stable ids.
+def _iter_lines(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    segments = [source] if isinstance(source, str) else source
+    for segment in segments:
+        for line in segment.splitlines():
+            if line.strip():
+                yield _normalize_line(line)
 
-    Returns:
-        [{"chunk_id": "C-<hash>", "text": "..."}, ...]
+
+def _make_chunk(bucket: List[str]) -> Dict[str, str]:
+    chunk_text = "\n".join(bucket)
+    chunk_id = f"C-{_line_key(chunk_text)}"
+    return {"chunk_id": chunk_id, "text": chunk_text, "terms": term_frequencies(chunk_text)}
+
+
+def iter_chunks(
+    text: Union[str, Iterable[str]],
+    max_lines: int = 5,
+    max_tokens: Optional[int] = None,
+) -> Iterator[Dict[str, str]]:
     """
-    lines = [_normalize_line(l) for l in text.splitlines() if l.strip()]
-    if not lines:
-        return []
+    Streaming form of `chunk_requirements`.
+
+    `text` is the full requirements text or an iterable of lines or segments
+    (such as PDF pages from `ingestion.loader.iter_requirements`). Each chunk is
+    yielded as soon as its bucket closes, with the same `C-<sha1>` id the
+    batch form produces.
 
-    chunks: List[Dict[str, str]] = []
+    With `max_tokens` (default CHUNK_MAX_TOKENS), buckets are packed up to that
+    many estimated tokens instead of `max_lines` lines; semantic breaks still
+    close a bucket in both modes.
+    """
+    max_tokens = CHUNK_MAX_TOKENS if max_tokens is None else max_tokens
     bucket: List[str] = []
+    bucket_tokens = 0
+
+    for line in _iter_lines(text):
+        if max_tokens > 0:
+            line_tokens = estimate_tokens(line)
+            if bucket and bucket_tokens + line_tokens > max_tokens:
+                yield _make_chunk(bucket)
+                bucket, bucket_tokens = [], 0
+            bucket_tokens += line_tokens
 
-    for line in lines:
         bucket.append(line)
-        semantic_break = line.endswith(":") or line.lower().startswith(("epic", "module", "feature"))
-        if len(bucket) >= max_lines or semantic_break:
-            chunk_text = "\n".join(bucket)
-            chunk_id = f"C-{_line_key(chunk_text)}"
-            chunks.append({"chunk_id": chunk_id, "text": chunk_text})
-            bucket = []
+        semantic_break = line.endswith(":") or line.lower().startswith(SEMANTIC_PREFIXES)
+        if semantic_break or (max_tokens <= 0 and len(bucket) >= max_lines):
+            yield _make_chunk(bucket)
+            bucket, bucket_tokens = [], 0
 
     if bucket:
-        chunk_text = "\n".join(bucket)
-        chunk_id = f"C-{_line_key(chunk_text)}"
-        chunks.append({"chunk_id": chunk_id, "text": chunk_text})
+        yield _make_chunk(bucket)
+
+
+def chunk_requirements(
+    text: Union[str, Iterable[str]],
+    max_lines: int = 5,
+    max_tokens: Optional[int] = None,
+) -> List[Dict[str, str]]:
+    """
+    Build small semantic chunks with stable ids.
+
+    Returns:
+        [{"chunk_id": "C-<hash>", "text": "...", "terms": {"term": count}}, ...]
+
+    `terms` feeds the BM25 inverted index in `rag.lexical`.
+    """
+    return list(iter_chunks(text, max_lines=max_lines, max_tokens=max_tokens))
+
 
-    return chunks
+def chunking_report(chunks: List[Dict[str, str]]) -> Dict[str, int]:
+    """Chunk count (one epic LLM call each) and the estimated prompt tokens those calls send."""
+    prompt_overhead = estimate_tokens(generate_epics_prompt(chunk_id="C-0000000000", chunk_text=""))
+    chunk_tokens = sum(estimate_tokens(chunk["text"]) for chunk in chunks)
+    return {
+        "chunk_count": len(chunks),
+        "chunk_tokens": chunk_tokens,
+        "estimated_prompt_tokens": chunk_tokens + prompt_overhead * len(chunks),
+    }
@@ -1,22 +1,141 @@
-
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional
 
 import pandas as pd
 from PyPDF2 import PdfReader
 
-def load_requirements(uploaded_file):
-    file_type = uploaded_file.name.split(".")[-1].lower()
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "50000"))
+# Comma-separated default column allowlist for CSV exports; empty keeps every column.
+CSV_COLUMNS = [c.strip() for c in os.getenv("CSV_COLUMNS", "").split(",") if c.strip()]
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+
+
+SUPPORTED_FILE_TYPES = ("txt", "csv", "pdf")
+
+
+def file_type_of(filename: str) -> str:
+    return filename.split(".")[-1].lower()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_pool
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_pdf_pages(uploaded_file, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield PDF page text in page order.
+
+    Page ranges are extracted across a process pool with at most `workers`
+    ranges in flight, so memory stays bounded by the pool size rather than
+    the document length.
+    """
+    workers = PDF_EXTRACT_WORKERS if workers is None else workers
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as spooled:
+            shutil.copyfileobj(uploaded_file, spooled)
+
+        page_count = len(PdfReader(path).pages)
+        if workers <= 1 or page_count <= PDF_PAGES_PER_TASK:
+            for start in range(0, page_count, PDF_PAGES_PER_TASK):
+                yield from _extract_page_range(path, start, min(page_count, start + PDF_PAGES_PER_TASK))
+            return
+
+        pool = _get_pdf_pool()
+        ranges = [(start, min(page_count, start + PDF_PAGES_PER_TASK)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+        in_flight = [pool.submit(_extract_page_range, path, start, end) for start, end in ranges[:workers]]
+        next_range = len(in_flight)
+        while in_flight:
+            pages = in_flight.pop(0).result()
+            if next_range < len(ranges):
+                in_flight.append(pool.submit(_extract_page_range, path, *ranges[next_range]))
+                next_range += 1
+            yield from pages
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def iter_csv_rows(
+    uploaded_file,
+    columns: Optional[Iterable[str]] = None,
+    chunksize: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Yield one " | "-joined string per CSV row.
+
+    The file is read in `chunksize` row blocks and each block's strings are built
+    column-wise with vectorized string concatenation. `columns` (or CSV_COLUMNS)
+    restricts which columns are read at all; unknown names are ignored.
+    """
+    allowlist = set(columns or CSV_COLUMNS)
+    reader = pd.read_csv(
+        uploaded_file,
+        dtype=str,
+        usecols=(lambda name: name in allowlist) if allowlist else None,
+        chunksize=chunksize or CSV_CHUNK_ROWS,
+    )
+    for frame in reader:
+        if frame.empty or not len(frame.columns):
+            continue
+        # Cells are read as text so every block renders values the same way; blanks keep the "nan" marker.
+        frame = frame.fillna("nan")
+        rows = frame.iloc[:, 0]
+        for name in frame.columns[1:]:
+            rows = rows + " | " + frame[name]
+        yield from rows.tolist()
+
+
+def iter_requirements(
+    uploaded_file,
+    columns: Optional[Iterable[str]] = None,
+    filename: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Yield requirement text segments (whole text, CSV rows or PDF pages) as they are read.
+
+    The format comes from `filename`, or `uploaded_file.name` when not given.
+    """
+    file_type = file_type_of(filename or uploaded_file.name)
 
     if file_type == "txt":
-        return uploaded_file.read().decode("utf-8")
+        yield uploaded_file.read().decode("utf-8")
+        return
 
     if file_type == "csv":
-        df = pd.read_csv(uploaded_file)
-        return "\n".join(
-            df.astype(str).apply(lambda row: " | ".join(row), axis=1)
-        )
+        yield from iter_csv_rows(uploaded_file, columns=columns)
+        return
 
     if file_type == "pdf":
-        reader = PdfReader(uploaded_file)
-        return "\n".join(page.extract_text() or "" for page in reader.pages)
+        yield from iter_pdf_pages(uploaded_file)
+        return
 
     raise ValueError("Unsupported file format")
+
+
+def load_requirements(uploaded_file, columns: Optional[Iterable[str]] = None):
+    return "\n".join(iter_requirements(uploaded_file, columns=columns))
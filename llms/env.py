@@ -0,0 +1,9 @@
+import os
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Boolean environment switch: "1", "true", "yes" or "on" enable it; unset or empty keeps `default`."""
+    value = str(os.getenv(name, "")).strip().lower()
+    if not value:
+        return default
+    return value in {"1", "true", "yes", "on"}
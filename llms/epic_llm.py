@@ -1,14 +1,20 @@
+import asyncio
 import hashlib
 import json
 import os
 import time
 from functools import lru_cache
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional
 
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq, Groq
 
+from llms.groq_client import get_async_client, get_client
+from llms.json_repair import record_llm_fallback
 from llms.parser import ensure_epic_schema, parse_llm_json
+from llms.response_cache import cached_completion, cached_completion_async, response_cache_key
+from llms.scheduler import handles_rate_limits, run_scheduled, run_scheduled_async
+from llms.single_flight import llm_async_flights, llm_flights
 from prompts.epic_prompts import generate_epics_prompt, regenerate_epic_prompt
 
 
@@ -19,34 +25,125 @@ def _get_client() -> Groq:
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise RuntimeError("GROQ_API_KEY not set")
-    return Groq(api_key=api_key)
+    return get_client(api_key)
 
 
-def _chat_with_backoff(prompt: str, model: str, max_tokens: int, temperature: float = 0.2) -> str:
+def _get_async_client() -> AsyncGroq:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise RuntimeError("GROQ_API_KEY not set")
+    return get_async_client(api_key)
+
+
+def _chat_params(model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    return {"max_tokens": max_tokens, "temperature": temperature, "json_mode": model.endswith("8b-instant")}
+
+
+def _chat_kwargs(prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    kwargs = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    if model.endswith("8b-instant"):
+        kwargs["response_format"] = {"type": "json_object"}
+    return kwargs
+
+
+def _chat_with_backoff(
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float = 0.2,
+    use_cache: bool = False,
+    validate: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """
+    Run one chat completion with retries.
+
+    Concurrent calls with the same request share one in-flight completion.
+    With `use_cache`, identical requests are served from the shared disk cache;
+    `validate` keeps responses it rejects out of the cache.
+    """
+    params = _chat_params(model, max_tokens, temperature)
+    key = response_cache_key(model, prompt, params)
+    if not use_cache:
+        return llm_flights.do(key, lambda: _complete_with_backoff(prompt, model, max_tokens, temperature))
+    # concurrent identical requests share one cache lookup and at most one model call
+    return llm_flights.do(
+        f"cached:{key}",
+        lambda: cached_completion(
+            model,
+            prompt,
+            params,
+            lambda: _complete_with_backoff(prompt, model, max_tokens, temperature),
+            validate=validate,
+        ),
+    )
+
+
+def _complete_with_backoff(prompt: str, model: str, max_tokens: int, temperature: float = 0.2) -> str:
     client = _get_client()
+    kwargs = _chat_kwargs(prompt, model, max_tokens, temperature)
     sleep_seconds = 1
     for attempt in range(4):
         try:
-            kwargs = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-            }
-            if model.endswith("8b-instant"):
-                kwargs["response_format"] = {"type": "json_object"}
-            response = client.chat.completions.create(**kwargs)
+            response = run_scheduled(model, prompt, lambda: client.chat.completions.create(**kwargs), max_tokens)
             return response.choices[0].message.content.strip()
-        except Exception:
-            if attempt == 3:
+        except Exception as exc:
+            if attempt == 3 or handles_rate_limits(exc):
                 raise
             time.sleep(sleep_seconds)
             sleep_seconds *= 2
     raise RuntimeError("LLM call failed")
 
 
-def _repair_json_with_llm(raw_text: str) -> str:
-    repair_prompt = f"""
+async def _chat_with_backoff_async(
+    prompt: str,
+    model: str,
+    max_tokens: int,
+    temperature: float = 0.2,
+    use_cache: bool = False,
+    validate: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """`_chat_with_backoff` on the AsyncGroq client; waits never block the event loop."""
+    params = _chat_params(model, max_tokens, temperature)
+    key = response_cache_key(model, prompt, params)
+    if not use_cache:
+        return await llm_async_flights.do(key, lambda: _complete_with_backoff_async(prompt, model, max_tokens, temperature))
+    return await llm_async_flights.do(
+        f"cached:{key}",
+        lambda: cached_completion_async(
+            model,
+            prompt,
+            params,
+            lambda: _complete_with_backoff_async(prompt, model, max_tokens, temperature),
+            validate=validate,
+        ),
+    )
+
+
+async def _complete_with_backoff_async(prompt: str, model: str, max_tokens: int, temperature: float = 0.2) -> str:
+    client = _get_async_client()
+    kwargs = _chat_kwargs(prompt, model, max_tokens, temperature)
+    sleep_seconds = 1
+    for attempt in range(4):
+        try:
+            response = await run_scheduled_async(
+                model, prompt, lambda: client.chat.completions.create(**kwargs), max_tokens
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as exc:
+            if attempt == 3 or handles_rate_limits(exc):
+                raise
+            await asyncio.sleep(sleep_seconds)
+            sleep_seconds *= 2
+    raise RuntimeError("LLM call failed")
+
+
+def _repair_prompt(raw_text: str) -> str:
+    return f"""
 Convert the following text into strictly valid RFC-8259 JSON.
 Rules:
 - Output JSON only.
@@ -57,31 +154,61 @@ Rules:
 Text:
 {raw_text}
 """
+
+
+def _repair_json_with_llm(raw_text: str) -> str:
     return _chat_with_backoff(
-        repair_prompt,
+        _repair_prompt(raw_text),
         model="llama-3.1-8b-instant",
         max_tokens=1200,
         temperature=0,
+        use_cache=True,
+        validate=_parse_epics,
     )
 
 
-@lru_cache(maxsize=512)
-def _cached_generate(chunk_id: str, text_hash: str, chunk_text: str) -> tuple:
-    prompt = generate_epics_prompt(chunk_id=chunk_id, chunk_text=chunk_text)
-    raw = _chat_with_backoff(prompt, model="llama-3.3-70b-versatile", max_tokens=1000, temperature=0.2)
-    try:
-        parsed = ensure_epic_schema(parse_llm_json(raw))
-    except Exception:
-        repaired = _repair_json_with_llm(raw)
-        parsed = ensure_epic_schema(parse_llm_json(repaired))
+async def _repair_json_with_llm_async(raw_text: str) -> str:
+    return await _chat_with_backoff_async(
+        _repair_prompt(raw_text),
+        model="llama-3.1-8b-instant",
+        max_tokens=1200,
+        temperature=0,
+        use_cache=True,
+        validate=_parse_epics,
+    )
 
+
+def _parse_epics(raw: str) -> List[Dict]:
+    return ensure_epic_schema(parse_llm_json(raw))
+
+
+def _with_provenance(epics: List[Dict], chunk_id: str) -> List[Dict]:
     # retain provenance for better regeneration context
-    for epic in parsed:
+    for epic in epics:
         epic.setdefault("source_chunk_ids", [])
         if chunk_id not in epic["source_chunk_ids"]:
             epic["source_chunk_ids"].append(chunk_id)
+    return epics
 
-    return tuple(json.dumps(epic, sort_keys=True) for epic in parsed)
+
+@lru_cache(maxsize=512)
+def _cached_generate(chunk_id: str, text_hash: str, chunk_text: str) -> tuple:
+    prompt = generate_epics_prompt(chunk_id=chunk_id, chunk_text=chunk_text)
+    raw = _chat_with_backoff(
+        prompt,
+        model="llama-3.3-70b-versatile",
+        max_tokens=1000,
+        temperature=0.2,
+        use_cache=True,
+        validate=_parse_epics,
+    )
+    try:
+        parsed = _parse_epics(raw)
+    except Exception:
+        record_llm_fallback()
+        parsed = _parse_epics(_repair_json_with_llm(raw))
+
+    return tuple(json.dumps(epic, sort_keys=True) for epic in _with_provenance(parsed, chunk_id))
 
 
 def generate_epics_from_chunk(chunk: Dict[str, str]) -> List[Dict]:
@@ -90,7 +217,26 @@ def generate_epics_from_chunk(chunk: Dict[str, str]) -> List[Dict]:
     return [json.loads(x) for x in rows]
 
 
-def regenerate_epic(chunk_text: str, epic_name: str, previous_description: str = "") -> Dict:
+async def generate_epics_from_chunk_async(chunk: Dict[str, str]) -> List[Dict]:
+    """Async `generate_epics_from_chunk`; repeat chunks are served by the shared response cache."""
+    prompt = generate_epics_prompt(chunk_id=chunk["chunk_id"], chunk_text=chunk["text"])
+    raw = await _chat_with_backoff_async(
+        prompt,
+        model="llama-3.3-70b-versatile",
+        max_tokens=1000,
+        temperature=0.2,
+        use_cache=True,
+        validate=_parse_epics,
+    )
+    try:
+        parsed = _parse_epics(raw)
+    except Exception:
+        record_llm_fallback()
+        parsed = _parse_epics(await _repair_json_with_llm_async(raw))
+    return _with_provenance(parsed, chunk["chunk_id"])
+
+
+def regenerate_epic(chunk_text: str, epic_name: str, previous_description: str = "", use_cache: bool = False) -> Dict:
     prompt = regenerate_epic_prompt(
         chunk_text=chunk_text,
         epic_name=epic_name,
@@ -101,6 +247,7 @@ def regenerate_epic(chunk_text: str, epic_name: str, previous_description: str =
         model="llama-3.3-70b-versatile",
         max_tokens=900,
         temperature=0.35,
+        use_cache=use_cache,
     )
     payload = parse_llm_json(raw)
     if not isinstance(payload, dict):
@@ -119,6 +266,7 @@ def regenerate_epic(chunk_text: str, epic_name: str, previous_description: str =
             model="llama-3.3-70b-versatile",
             max_tokens=900,
             temperature=0.6,
+            use_cache=use_cache,
         )
         payload_2 = parse_llm_json(raw_2)
         if isinstance(payload_2, dict):
@@ -1,17 +1,91 @@
-from typing import Dict, List
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from llms.epic_llm import generate_epics_from_chunk
+from llms.epic_llm import generate_epics_from_chunk, generate_epics_from_chunk_async
 from llms.epic_reducer import merge_and_dedupe_epics
 
 
+# Upper bound on concurrent chunk calls; 1 restores the serial loop.
+EPIC_MAX_IN_FLIGHT = int(os.getenv("EPIC_MAX_IN_FLIGHT", "4"))
+
+
 def generate_epics_from_requirements(
     chunks: List[Dict[str, str]],
     query: str = "high level business capabilities",
     top_k: int = 8,
+    max_in_flight: Optional[int] = None,
 ) -> List[Dict]:
-    """Generate epics in the same order as the uploaded source chunks."""
+    """
+    Generate epics in the same order as the uploaded source chunks.
+
+    Up to `max_in_flight` (EPIC_MAX_IN_FLIGHT) chunk calls run at once; results are
+    collected back in source order before merging, so the merged plan is the same
+    as a serial run.
+    """
+    max_in_flight = EPIC_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+    workers = max(1, min(max_in_flight, len(chunks)))
+    if workers == 1:
+        per_chunk = [generate_epics_from_chunk(chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="epic-gen") as executor:
+            per_chunk = list(executor.map(generate_epics_from_chunk, chunks))
+
     mapped_epics: List[Dict] = []
-    for chunk in chunks:
-        mapped_epics.extend(generate_epics_from_chunk(chunk))
+    for epics in per_chunk:
+        mapped_epics.extend(epics)
 
     return merge_and_dedupe_epics(mapped_epics)
+
+
+async def generate_epics_from_requirements_async(
+    chunks: List[Dict[str, str]],
+    max_in_flight: Optional[int] = None,
+) -> List[Dict]:
+    """Async `generate_epics_from_requirements`: a semaphore bounds in-flight calls, gather keeps source order."""
+    max_in_flight = EPIC_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def generate(chunk: Dict[str, str]) -> List[Dict]:
+        async with semaphore:
+            return await generate_epics_from_chunk_async(chunk)
+
+    per_chunk = await asyncio.gather(*(generate(chunk) for chunk in chunks))
+    mapped_epics: List[Dict] = []
+    for epics in per_chunk:
+        mapped_epics.extend(epics)
+
+    return merge_and_dedupe_epics(mapped_epics)
+
+
+async def iter_chunk_epics_async(
+    chunks: List[Dict[str, str]],
+    max_in_flight: Optional[int] = None,
+) -> AsyncIterator[Tuple[int, List[Dict], Optional[BaseException]]]:
+    """
+    Yield (chunk index, epics, error) for each chunk as soon as its call finishes.
+
+    Results arrive in completion order, not source order; a failed chunk yields
+    its exception instead of stopping the others. Pending calls are cancelled if
+    the consumer stops early.
+    """
+    max_in_flight = EPIC_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+    semaphore = asyncio.Semaphore(max(1, max_in_flight))
+
+    async def generate(index: int, chunk: Dict[str, str]) -> Tuple[int, List[Dict], Optional[BaseException]]:
+        async with semaphore:
+            try:
+                return index, await generate_epics_from_chunk_async(chunk), None
+            except Exception as exc:  # noqa: BLE001 - reported per chunk
+                return index, [], exc
+
+    tasks = [asyncio.create_task(generate(index, chunk)) for index, chunk in enumerate(chunks)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # only this stream's waits are cancelled; identical in-flight LLM calls
+        # shared with other callers keep running (see AsyncSingleFlight)
+        for task in tasks:
+            task.cancel()
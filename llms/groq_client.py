@@ -1,8 +1,96 @@
-
+import asyncio
+import importlib.util
 import os
-from groq import Groq
+import threading
+import weakref
+from typing import Dict, Optional
+
+import httpx
 from dotenv import load_dotenv
+from groq import AsyncGroq, Groq
+
+from llms.env import env_flag
+
 load_dotenv()
 
-def get_client():
-    return Groq(api_key=os.getenv("GROQ_API_KEY"))
+# Connection pool shared by every Groq call in the process.
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "32"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "16"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "120"))
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "120"))
+
+
+def http2_enabled() -> bool:
+    """HTTP/2 needs the optional `h2` package; GROQ_HTTP2=false forces HTTP/1.1."""
+    return env_flag("GROQ_HTTP2", True) and importlib.util.find_spec("h2") is not None
+
+
+def pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=GROQ_MAX_CONNECTIONS,
+        max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+        keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+    )
+
+
+_clients: Dict[Optional[str], Groq] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: Optional[str] = None) -> Groq:
+    """
+    Process-wide Groq client for `api_key` (GROQ_API_KEY by default), created on first use.
+
+    Every call reuses its keep-alive connection pool, so TLS handshakes are paid once
+    per connection instead of once per request.
+    """
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            http_client = httpx.Client(
+                http2=http2_enabled(),
+                limits=pool_limits(),
+                timeout=GROQ_TIMEOUT_SECONDS,
+            )
+            try:
+                client = Groq(api_key=api_key, http_client=http_client)
+            except Exception:
+                http_client.close()
+                raise
+            _clients[api_key] = client
+        return client
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Optional[str], AsyncGroq]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_client(api_key: Optional[str] = None) -> AsyncGroq:
+    """Pooled AsyncGroq client for the running event loop (async connections cannot cross loops)."""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(api_key)
+        if client is None:
+            http_client = httpx.AsyncClient(
+                http2=http2_enabled(),
+                limits=pool_limits(),
+                timeout=GROQ_TIMEOUT_SECONDS,
+            )
+            try:
+                client = AsyncGroq(api_key=api_key, http_client=http_client)
+            except Exception:
+                loop.create_task(http_client.aclose())
+                raise
+            clients[api_key] = client
+        return client
+
+
+class LazyClient:
+    """Module-level stand-in for a Groq client that resolves to the pooled client on first attribute access."""
+
+    def __getattr__(self, name: str):
+        return getattr(get_client(), name)
@@ -0,0 +1,228 @@
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, List
+
+
+# Anchored at both ends: a fence only wraps the payload when the output starts with it, and
+# only a closing fence at the very end (or none, when output was cut off) ends it, so fenced
+# blocks inside string values are never mistaken for the payload or its end.
+FENCE_PATTERN = re.compile(r"\A\s*```[a-zA-Z0-9_-]*[ \t]*\n?(.*?)(?:```)?\s*\Z", re.DOTALL)
+SMART_DOUBLE_QUOTES = frozenset("“”„″")
+CLOSERS = {"{": "}", "[": "]"}
+
+_counts = {"direct": 0, "repaired": 0, "failed": 0, "llm_fallback": 0}
+_counts_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _counts_lock:
+        _counts[name] += 1
+
+
+def record_llm_fallback() -> None:
+    """Called when a caller still has to send output to the LLM for repair."""
+    _count("llm_fallback")
+
+
+def repair_stats() -> Dict[str, int]:
+    with _counts_lock:
+        return dict(_counts)
+
+
+def strip_fences(text: str) -> str:
+    match = FENCE_PATTERN.match(text)
+    return match.group(1) if match else text
+
+
+def extract_json_span(text: str) -> str:
+    """From the first `{` or `[` to the last matching-kind closer, or to the end when output was cut off."""
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return text
+    start = min(starts)
+    end = text.rfind(CLOSERS[text[start]])
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def normalize_smart_quotes(text: str) -> str:
+    """
+    Curly double quotes used as JSON delimiters become straight.
+
+    A string opened by a curly quote closes on the next curly quote and any bare
+    straight quote inside it is escaped; curly quotes inside a straight-quoted
+    string are left alone as content.
+    """
+    out: List[str] = []
+    opener = ""
+    escaped = False
+    for char in text:
+        if opener:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif opener == "smart" and char in SMART_DOUBLE_QUOTES:
+                char, opener = '"', ""
+            elif opener == "smart" and char == '"':
+                char = '\\"'
+            elif opener == "straight" and char == '"':
+                opener = ""
+            out.append(char)
+            continue
+        if char in SMART_DOUBLE_QUOTES:
+            char, opener = '"', "smart"
+        elif char == '"':
+            opener = "straight"
+        out.append(char)
+    return "".join(out)
+
+
+def escape_control_chars_in_strings(text: str) -> str:
+    """Escape raw newlines, tabs and other control characters inside quoted strings."""
+    out: List[str] = []
+    in_string = False
+    escaped = False
+
+    for char in text:
+        if in_string:
+            if escaped:
+                out.append(char)
+                escaped = False
+            elif char == "\\":
+                out.append(char)
+                escaped = True
+            elif char == '"':
+                out.append(char)
+                in_string = False
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\r":
+                out.append("\\r")
+            elif char == "\t":
+                out.append("\\t")
+            elif ord(char) < 0x20:
+                out.append(f"\\u{ord(char):04x}")
+            else:
+                out.append(char)
+            continue
+
+        out.append(char)
+        if char == '"':
+            in_string = True
+
+    return "".join(out)
+
+
+def remove_trailing_commas(text: str) -> str:
+    """Drop commas that directly precede a closing `}` or `]` outside strings."""
+    out: List[str] = []
+    in_string = False
+    escaped = False
+    pending_comma = -1
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char in "}]" and pending_comma >= 0:
+            del out[pending_comma]
+        if char == ",":
+            pending_comma = len(out)
+        elif not char.isspace():
+            pending_comma = -1
+        out.append(char)
+        if char == '"':
+            in_string = True
+    return "".join(out)
+
+
+def close_truncated(text: str) -> str:
+    """Close an unterminated string and any brackets left open by output that was cut off."""
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    key_start = -1
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+            key_start = index
+        elif char in CLOSERS:
+            stack.append(CLOSERS[char])
+        elif char in "}]" and stack:
+            stack.pop()
+
+    if not stack and not in_string:
+        return text
+
+    repaired = text[:-1] if escaped else text
+    if in_string:
+        repaired += '"'
+    repaired = repaired.rstrip()
+    if repaired.endswith(":") and stack and stack[-1] == "}":
+        # a key with no value: drop it rather than invent one
+        repaired = repaired[:key_start].rstrip()
+    elif stack and stack[-1] == "}" and repaired.endswith('"') and repaired[:key_start].rstrip()[-1:] in "{,":
+        # a bare key cut off before its colon
+        repaired = repaired[:key_start].rstrip()
+    repaired = repaired.rstrip().rstrip(",")
+    return repaired + "".join(reversed(stack))
+
+
+REPAIR_STEPS: List[Callable[[str], str]] = [
+    strip_fences,
+    extract_json_span,
+    normalize_smart_quotes,
+    escape_control_chars_in_strings,
+    remove_trailing_commas,
+    close_truncated,
+]
+
+
+def repair_json(text: str) -> str:
+    """Apply every local repair step in order; cheap and deterministic, no model call."""
+    for step in REPAIR_STEPS:
+        text = step(text)
+    return text
+
+
+def loads_repaired(text: str) -> Any:
+    """
+    `json.loads` that falls back to the local repair pipeline.
+
+    Steps are applied cumulatively and parsing is retried after each one, so
+    well-formed output is never rewritten. Raises ValueError when nothing parses.
+    """
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    else:
+        _count("direct")
+        return payload
+
+    candidate = text.strip()
+    for step in REPAIR_STEPS:
+        candidate = step(candidate)
+        try:
+            payload = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        _count("repaired")
+        return payload
+
+    _count("failed")
+    raise ValueError("No valid JSON found in LLM output")
@@ -1,21 +1,16 @@
-import json
-import re
 from typing import Any, Dict, List
 
-
-JSON_BLOCK_PATTERN = re.compile(r"(\[.*\]|\{.*\})", re.DOTALL)
+from llms.json_repair import loads_repaired
 
 
 def parse_llm_json(text: str) -> Any:
-    """Extract and parse JSON safely from noisy LLM output."""
-    payload = text.strip()
-    try:
-        return json.loads(payload)
-    except json.JSONDecodeError:
-        match = JSON_BLOCK_PATTERN.search(payload)
-        if not match:
-            raise ValueError("No valid JSON found in LLM output")
-        return json.loads(match.group(1))
+    """
+    Extract and parse JSON safely from noisy LLM output.
+
+    Fences, smart quotes, raw control characters, trailing commas and truncated
+    closers are repaired locally (see `llms.json_repair`) before giving up.
+    """
+    return loads_repaired(text.strip())
 
 
 def ensure_story_schema(data: Any) -> List[Dict[str, Any]]:
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from llms.env import env_flag
+
+
+LLM_CACHE_DIR = Path(os.getenv("LLM_CACHE_DIR") or (Path.cwd() / ".llm_cache"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+
+def response_cache_key(model: str, prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """SHA-256 over the model, prompt and every generation parameter that changes the output."""
+    payload = json.dumps({"model": model, "prompt": prompt, "params": params or {}}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed LLM response cache shared by every worker process.
+
+    The database runs in WAL mode so readers in one process never block a writer
+    in another. Entries expire after `ttl` seconds and the least recently used
+    rows are evicted once more than `max_entries` are stored.
+    """
+
+    def __init__(self, root: Path, ttl: float = LLM_CACHE_TTL_SECONDS, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.root / "responses.sqlite3", timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._open()
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._open()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, model, response, now, now),
+                )
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._open().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        # reporting must not create the database when nothing has been cached yet
+        exists = self._conn is not None or (self.root / "responses.sqlite3").exists()
+        return {
+            "enabled": True,
+            "hits": hits,
+            "misses": misses,
+            "entries": len(self) if exists else 0,
+            "max_entries": self.max_entries,
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache, or None when LLM_CACHE_ENABLED is off."""
+    global _cache
+    if not env_flag("LLM_CACHE_ENABLED", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(LLM_CACHE_DIR)
+        return _cache
+
+
+def _storable(response: str, validate: Optional[Callable[[str], Any]]) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(response)
+    except Exception:
+        return False
+    return True
+
+
+def cached_completion(
+    model: str,
+    prompt: str,
+    params: Dict[str, Any],
+    call: Callable[[], str],
+    validate: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """
+    Return the cached response for this exact request, or run `call` and store its result.
+
+    When `validate` is given, a response is only stored if `validate(response)`
+    does not raise, so unparseable output is never replayed from the cache.
+    Cache I/O errors fall back to calling the model.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return call()
+
+    key = response_cache_key(model, prompt, params)
+    try:
+        cached = cache.get(key)
+    except (OSError, sqlite3.Error):
+        cached = None
+    if cached is not None:
+        return cached
+
+    response = call()
+    if _storable(response, validate):
+        try:
+            cache.put(key, model, response)
+        except (OSError, sqlite3.Error):
+            pass
+    return response
+
+
+async def cached_completion_async(
+    model: str,
+    prompt: str,
+    params: Dict[str, Any],
+    call: Callable[[], Awaitable[str]],
+    validate: Optional[Callable[[str], Any]] = None,
+) -> str:
+    """`cached_completion` for coroutines; SQLite reads and writes run in a worker thread."""
+    cache = get_response_cache()
+    if cache is None:
+        return await call()
+
+    key = response_cache_key(model, prompt, params)
+    try:
+        cached = await asyncio.to_thread(cache.get, key)
+    except (OSError, sqlite3.Error):
+        cached = None
+    if cached is not None:
+        return cached
+
+    response = await call()
+    if _storable(response, validate):
+        try:
+            await asyncio.to_thread(cache.put, key, model, response)
+        except (OSError, sqlite3.Error):
+            pass
+    return response
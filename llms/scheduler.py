@@ -0,0 +1,234 @@
+import asyncio
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+from llms.env import env_flag
+from llms.tokens import estimate_tokens
+
+
+T = TypeVar("T")
+
+# Per-model budgets as "model=rpm:tpm" pairs matching the account's Groq tier, e.g.
+# "llama-3.3-70b-versatile=1000:300000". Unlisted models fall back to LLM_DEFAULT_RPM /
+# LLM_DEFAULT_TPM; 0 (the default) leaves that budget unlimited, so out of the box the
+# scheduler only waits out 429 Retry-After and never throttles the epic fan-out.
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+LLM_DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", "0"))
+LLM_DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", "0"))
+# Completion budget assumed for calls that do not pass max_tokens.
+LLM_DEFAULT_COMPLETION_TOKENS = int(os.getenv("LLM_DEFAULT_COMPLETION_TOKENS", "1024"))
+# How many 429 responses a call may absorb (waiting out Retry-After each time) before raising.
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "6"))
+# Wait used when a 429 carries no usable Retry-After header.
+LLM_RATE_LIMIT_FALLBACK_SECONDS = float(os.getenv("LLM_RATE_LIMIT_FALLBACK_SECONDS", "2"))
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    limits: Dict[str, Tuple[int, int]] = {}
+    for entry in spec.split(","):
+        model, _, budget = entry.strip().partition("=")
+        rpm, _, tpm = budget.partition(":")
+        if model and rpm.strip():
+            limits[model.strip()] = (int(rpm), int(tpm or 0))
+    return limits
+
+
+class TokenBucket:
+    """
+    A per-minute budget refilled continuously.
+
+    `reserve` always succeeds: it deducts the cost (the balance may go negative)
+    and returns how long the caller must wait before the reservation is covered,
+    so queued callers are served in reservation order.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.balance = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.balance = min(self.capacity, self.balance + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float, now: float) -> float:
+        self._refill(now)
+        self.balance -= min(cost, self.capacity)
+        return 0.0 if self.balance >= 0 else -self.balance / self.rate
+
+    def refund(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.balance = min(self.capacity, self.balance + amount)
+
+    def drain(self, now: float) -> None:
+        self._refill(now)
+        self.balance = min(self.balance, 0.0)
+
+
+class RateLimitScheduler:
+    """
+    Requests-per-minute and tokens-per-minute budgets per model.
+
+    `reserve` returns the delay a call must wait rather than sleeping itself, so
+    thread and asyncio callers share one set of budgets.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int]]] = None, default: Tuple[int, int] = (0, 0)):
+        self.limits = dict(limits or {})
+        self.default = default
+        self._buckets: Dict[str, Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _model_buckets(self, model: str) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            rpm, tpm = self.limits.get(model, self.default)
+            buckets = (TokenBucket(rpm) if rpm > 0 else None, TokenBucket(tpm) if tpm > 0 else None)
+            self._buckets[model] = buckets
+        return buckets
+
+    def reserve(self, model: str, tokens: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            requests, token_budget = self._model_buckets(model)
+            delay = self._blocked_until.get(model, now) - now
+            if requests is not None:
+                delay = max(delay, requests.reserve(1, now))
+            if token_budget is not None:
+                delay = max(delay, token_budget.reserve(tokens, now))
+            return max(0.0, delay)
+
+    def settle(self, model: str, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """Give back the part of a token reservation the response did not use."""
+        if used_tokens is None or used_tokens >= reserved_tokens:
+            return
+        with self._lock:
+            _, token_budget = self._model_buckets(model)
+            if token_budget is not None:
+                token_budget.refund(reserved_tokens - used_tokens, time.monotonic())
+
+    def penalize(self, model: str, retry_after: float) -> None:
+        """Hold every call for `model` until the server's Retry-After has passed."""
+        now = time.monotonic()
+        with self._lock:
+            self._blocked_until[model] = max(self._blocked_until.get(model, now), now + retry_after)
+            for bucket in self._model_buckets(model):
+                if bucket is not None:
+                    bucket.drain(now)
+
+
+def estimate_call_tokens(prompt: str, max_tokens: Optional[int] = None) -> int:
+    return estimate_tokens(prompt) + (max_tokens or LLM_DEFAULT_COMPLETION_TOKENS)
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+def handles_rate_limits(exc: BaseException) -> bool:
+    """True when `exc` is a 429 the scheduler already retried, so callers must not retry it again."""
+    return is_rate_limited(exc) and get_scheduler() is not None
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Seconds from a 429's Retry-After header (delta-seconds or HTTP date), if present."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def response_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    total = getattr(usage, "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
+def run_scheduled(model: str, prompt: str, call: Callable[[], T], max_tokens: Optional[int] = None) -> T:
+    """
+    Run `call` once the model's budgets allow it, waiting out 429s instead of failing.
+
+    This is the only retry layer for 429s while the scheduler is on; other errors
+    propagate unchanged so callers keep their own retry policy for them.
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return call()
+
+    tokens = estimate_call_tokens(prompt, max_tokens)
+    for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+        delay = scheduler.reserve(model, tokens)
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            response = call()
+        except Exception as exc:
+            if not is_rate_limited(exc) or attempt == LLM_RATE_LIMIT_RETRIES:
+                raise
+            retry_after = retry_after_seconds(exc)
+            scheduler.penalize(model, LLM_RATE_LIMIT_FALLBACK_SECONDS if retry_after is None else retry_after)
+            continue
+        scheduler.settle(model, tokens, response_tokens(response))
+        return response
+    raise RuntimeError("LLM call was rate limited")
+
+
+async def run_scheduled_async(
+    model: str,
+    prompt: str,
+    call: Callable[[], Awaitable[T]],
+    max_tokens: Optional[int] = None,
+) -> T:
+    """`run_scheduled` for coroutines: waits with asyncio.sleep against the same shared budgets."""
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return await call()
+
+    tokens = estimate_call_tokens(prompt, max_tokens)
+    for attempt in range(LLM_RATE_LIMIT_RETRIES + 1):
+        delay = scheduler.reserve(model, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            response = await call()
+        except Exception as exc:
+            if not is_rate_limited(exc) or attempt == LLM_RATE_LIMIT_RETRIES:
+                raise
+            retry_after = retry_after_seconds(exc)
+            scheduler.penalize(model, LLM_RATE_LIMIT_FALLBACK_SECONDS if retry_after is None else retry_after)
+            continue
+        scheduler.settle(model, tokens, response_tokens(response))
+        return response
+    raise RuntimeError("LLM call was rate limited")
+
+
+_scheduler: Optional[RateLimitScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Optional[RateLimitScheduler]:
+    """Process-wide scheduler, or None when LLM_SCHEDULER_ENABLED is off."""
+    global _scheduler
+    if not env_flag("LLM_SCHEDULER_ENABLED", True):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler(
+                parse_rate_limits(LLM_RATE_LIMITS),
+                default=(LLM_DEFAULT_RPM, LLM_DEFAULT_TPM),
+            )
+        return _scheduler
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is in flight wait and receive the same result (or exception). Once the call
+    finishes the key is released, so later callers start a fresh call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class _AsyncCall:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    `SingleFlight` for coroutines.
+
+    The shared call runs in its own task and every caller, leader included,
+    awaits it through `asyncio.shield`, so cancelling one caller (e.g. a client
+    disconnect) never cancels the call for the others. The task is cancelled
+    only when its last waiter leaves. Calls are scoped to the running event
+    loop because tasks cannot be awaited from another loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, str], _AsyncCall] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _release(self, slot: Tuple[int, str], call: _AsyncCall) -> None:
+        if self._calls.get(slot) is call:
+            del self._calls[slot]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        call = self._calls.get(slot)
+        if call is None:
+            call = self._calls[slot] = _AsyncCall(loop.create_task(fn()))
+            call.task.add_done_callback(lambda _task: self._release(slot, call))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # nobody is left to receive the result; release the key first so a
+                # new caller starts a fresh call instead of joining a cancelled one
+                self._release(slot, call)
+                call.task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+# Shared by every LLM entry point so identical prompts coalesce across modules.
+llm_flights = SingleFlight()
+llm_async_flights = AsyncSingleFlight()
@@ -4,7 +4,7 @@ import time
 from functools import lru_cache
 from typing import Dict, List
 
-from llms.epic_llm import _chat_with_backoff
+from llms.epic_llm import _chat_with_backoff, _chat_with_backoff_async
 from llms.parser import ensure_story_schema, parse_llm_json
 from prompts.story_prompts import generate_story_prompt
 
@@ -13,29 +13,53 @@ def _cache_key(epic_name: str, chunk_id: str, chunk_text: str) -> str:
     return f"{epic_name}|{chunk_id}|{hashlib.sha1(chunk_text.encode('utf-8')).hexdigest()[:12]}"
 
 
-@lru_cache(maxsize=1024)
-def _cached_story_gen(cache_key: str, prompt: str) -> tuple:
-    raw = _chat_with_backoff(prompt, model="llama-3.1-8b-instant", max_tokens=1000)
+def _parse_stories(raw: str) -> List[Dict]:
     payload = parse_llm_json(raw)
     if isinstance(payload, dict) and "stories" in payload:
         payload = payload["stories"]
-    parsed = ensure_story_schema(payload)
+    return ensure_story_schema(payload)
+
+
+@lru_cache(maxsize=1024)
+def _cached_story_gen(cache_key: str, prompt: str) -> tuple:
+    raw = _chat_with_backoff(
+        prompt,
+        model="llama-3.1-8b-instant",
+        max_tokens=1000,
+        use_cache=True,
+        validate=_parse_stories,
+    )
+    parsed = _parse_stories(raw)
     return tuple(json.dumps(item, sort_keys=True) for item in parsed)
 
 
-def generate_stories_from_chunk(epic: Dict[str, str], chunk: Dict[str, str]) -> List[Dict]:
-    prompt = generate_story_prompt(
+def _story_prompt(epic: Dict[str, str], chunk: Dict[str, str]) -> str:
+    return generate_story_prompt(
         epic_name=epic["epic_name"],
         epic_description=epic.get("description", ""),
         chunk_id=chunk["chunk_id"],
         chunk_text=chunk["text"],
     )
+
+
+def generate_stories_from_chunk(epic: Dict[str, str], chunk: Dict[str, str]) -> List[Dict]:
     key = _cache_key(epic["epic_name"], chunk["chunk_id"], chunk["text"])
-    rows = _cached_story_gen(key, prompt)
+    rows = _cached_story_gen(key, _story_prompt(epic, chunk))
     return [json.loads(r) for r in rows]
 
 
-def regenerate_story(story: Dict[str, str], chunk_text: str) -> Dict:
+async def generate_stories_from_chunk_async(epic: Dict[str, str], chunk: Dict[str, str]) -> List[Dict]:
+    raw = await _chat_with_backoff_async(
+        _story_prompt(epic, chunk),
+        model="llama-3.1-8b-instant",
+        max_tokens=1000,
+        use_cache=True,
+        validate=_parse_stories,
+    )
+    return _parse_stories(raw)
+
+
+def regenerate_story(story: Dict[str, str], chunk_text: str, use_cache: bool = False) -> Dict:
     prompt = f"""
 Refine this user story; keep intent unchanged.
 Expand the description so it is more useful for delivery teams.
@@ -49,7 +73,7 @@ Return JSON only with keys summary, description, acceptance_criteria, definition
 Story: {json.dumps(story)}
 Context:\n{chunk_text}
 """
-    raw = _chat_with_backoff(prompt, model="llama-3.1-8b-instant", max_tokens=650)
+    raw = _chat_with_backoff(prompt, model="llama-3.1-8b-instant", max_tokens=650, use_cache=use_cache)
     payload = parse_llm_json(raw)
     if not isinstance(payload, dict):
         raise ValueError("Story regeneration should return JSON object")
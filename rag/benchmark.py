@@ -0,0 +1,99 @@
+"""
+Recall@k vs latency benchmark for the retrieval backends.
+
+Run with `python -m rag.benchmark` to pick RAG_ANN_THRESHOLD: the smallest corpus
+size where HNSW keeps recall above the target while answering clearly faster than
+exact flat search. Retrieval stays on flat search until RAG_ANN_THRESHOLD is set.
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from rag.embeddings import EMBEDDING_DIM
+from rag import vector_store
+from rag.vector_store import FlatIPBackend, HNSWBackend, ann_available
+
+
+def _synthetic_corpus(size: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    # Clustered vectors behave closer to real requirement chunks than uniform noise.
+    centers = rng.standard_normal((max(8, size // 200), dim)).astype(np.float32)
+    assignments = rng.integers(0, len(centers), size)
+    vectors = centers[assignments] + 0.35 * rng.standard_normal((size, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _per_query_ms(backend, queries: np.ndarray, k: int) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        backend.search(query, k)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def run_benchmark(sizes: List[int], k: int = 5, queries: int = 100, seed: int = 7) -> List[Dict[str, float]]:
+    rng = np.random.default_rng(seed)
+    results: List[Dict[str, float]] = []
+    for size in sizes:
+        corpus = _synthetic_corpus(size, EMBEDDING_DIM, rng)
+        probe = corpus[rng.integers(0, size, queries)] + 0.1 * rng.standard_normal((queries, EMBEDDING_DIM)).astype(np.float32)
+        probe /= np.linalg.norm(probe, axis=1, keepdims=True)
+
+        flat = FlatIPBackend(corpus)
+        _, truth = flat.search(probe, k)
+        row = {"size": size, "flat_ms": _per_query_ms(flat, probe, k)}
+
+        if ann_available():
+            start = time.perf_counter()
+            hnsw = HNSWBackend.build(corpus)
+            row["hnsw_build_s"] = time.perf_counter() - start
+            row["hnsw_ms"] = _per_query_ms(hnsw, probe, k)
+            _, approx = hnsw.search(probe, k)
+            hits = sum(len(set(a) & set(t)) for a, t in zip(approx.tolist(), truth.tolist()))
+            row["hnsw_recall"] = hits / (k * queries)
+        results.append(row)
+    return results
+
+
+def recommend_threshold(
+    results: List[Dict[str, float]],
+    min_recall: float = 0.95,
+    min_speedup: float = 2.0,
+    min_flat_ms: float = 2.0,
+) -> int:
+    """Smallest size where flat search is slow enough to matter and HNSW is faster at the target recall."""
+    for row in results:
+        if "hnsw_ms" not in row or row["flat_ms"] < min_flat_ms:
+            continue
+        if row["hnsw_recall"] >= min_recall and row["flat_ms"] >= min_speedup * row["hnsw_ms"]:
+            return int(row["size"])
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,5000,20000,50000,100000")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--ef-search", type=int, default=0, help="override RAG_HNSW_EF_SEARCH")
+    args = parser.parse_args()
+    if args.ef_search:
+        vector_store.RAG_HNSW_EF_SEARCH = args.ef_search
+
+    results = run_benchmark([int(s) for s in args.sizes.split(",") if s.strip()], k=args.k, queries=args.queries)
+    print(f"{'chunks':>8} {'flat ms':>9} {'hnsw ms':>9} {'recall@' + str(args.k):>9} {'build s':>8}")
+    for row in results:
+        print(
+            f"{row['size']:>8} {row['flat_ms']:>9.3f} {row.get('hnsw_ms', float('nan')):>9.3f} "
+            f"{row.get('hnsw_recall', float('nan')):>9.3f} {row.get('hnsw_build_s', float('nan')):>8.2f}"
+        )
+    threshold = recommend_threshold(results)
+    if threshold:
+        print(f"Suggested RAG_ANN_THRESHOLD={threshold}")
+    else:
+        print("HNSW never beat flat search at the target recall; keep flat search for these sizes.")
+
+
+if __name__ == "__main__":
+    main()
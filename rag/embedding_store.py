@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from llms.env import env_flag
+
+
+EMBEDDING_STORE_DIR = Path(os.getenv("EMBEDDING_STORE_DIR") or (Path.cwd() / ".embedding_cache"))
+EMBEDDING_STORE_MAX_ROWS = int(os.getenv("EMBEDDING_STORE_MAX_ROWS", "50000"))
+
+
+def content_key(model_name: str, text: str) -> str:
+    return hashlib.sha1(f"{model_name}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Disk-backed embedding cache shared by every worker process.
+
+    Vectors live in a fixed-capacity memory-mapped float32 matrix; a SQLite
+    table maps SHA1 content keys to matrix rows and tracks last use for LRU
+    eviction. Readers hold a SQLite shared lock while copying rows and writers
+    take an exclusive lock before touching the matrix, so a row is never read
+    while another process is overwriting it.
+    """
+
+    def __init__(self, root: Path, dim: int, capacity: int = EMBEDDING_STORE_MAX_ROWS):
+        self.root = Path(root)
+        self.dim = dim
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._matrix: Optional[np.memmap] = None
+
+    def _open(self) -> sqlite3.Connection:
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.root / "index.sqlite3", timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("BEGIN EXCLUSIVE")
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            layout = dict(conn.execute("SELECT name, value FROM meta").fetchall())
+            matrix_path = self.root / "vectors.f32"
+            expected_bytes = self.capacity * self.dim * 4
+            if (
+                layout.get("dim") != self.dim
+                or layout.get("capacity") != self.capacity
+                or not matrix_path.exists()
+                or matrix_path.stat().st_size != expected_bytes
+            ):
+                conn.execute("DELETE FROM entries")
+                conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (self.dim,))
+                conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('capacity', ?)", (self.capacity,))
+                with open(matrix_path, "wb") as handle:
+                    handle.truncate(expected_bytes)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            conn.close()
+            raise
+
+        self._matrix = np.memmap(matrix_path, dtype=np.float32, mode="r+", shape=(self.capacity, self.dim))
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _lookup(conn: sqlite3.Connection, keys: List[str]) -> List[Tuple[str, int]]:
+        rows: List[Tuple[str, int]] = []
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" for _ in batch)
+            rows.extend(conn.execute(f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch).fetchall())
+        return rows
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            conn = self._open()
+            conn.execute("BEGIN")
+            try:
+                for key, row in self._lookup(conn, keys):
+                    found[key] = np.array(self._matrix[row], dtype=np.float32)
+            finally:
+                conn.execute("COMMIT")
+
+            if found:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        if not vectors:
+            return
+
+        with self._lock:
+            conn = self._open()
+            conn.execute("BEGIN EXCLUSIVE")
+            try:
+                existing = {key for key, _ in self._lookup(conn, list(vectors))}
+                pending = [(key, vec) for key, vec in vectors.items() if key not in existing][: self.capacity]
+                if not pending:
+                    conn.execute("COMMIT")
+                    return
+
+                used = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                free_rows = list(range(used, min(self.capacity, used + len(pending))))
+                shortfall = len(pending) - len(free_rows)
+                if shortfall > 0:
+                    evicted = conn.execute(
+                        "SELECT key, row FROM entries ORDER BY last_used ASC LIMIT ?",
+                        (shortfall,),
+                    ).fetchall()
+                    conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+                    free_rows.extend(row for _, row in evicted)
+
+                now = time.time()
+                for (key, vec), row in zip(pending, free_rows):
+                    self._matrix[row] = np.asarray(vec, dtype=np.float32)
+                self._matrix.flush()
+                conn.executemany(
+                    "INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)",
+                    [(key, row, now) for (key, _), row in zip(pending, free_rows)],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._open().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+_store: Optional[EmbeddingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_embedding_store(dim: int) -> Optional[EmbeddingStore]:
+    """Process-wide store, or None when EMBEDDING_STORE_ENABLED is off."""
+    global _store
+    if not env_flag("EMBEDDING_STORE_ENABLED", True):
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = EmbeddingStore(EMBEDDING_STORE_DIR, dim)
+        return _store
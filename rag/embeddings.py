@@ -1,28 +1,175 @@
-from functools import lru_cache
-from typing import Iterable, List
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
+from rag.embedding_store import content_key, get_embedding_store
+from rag.encoder_pool import EMBED_POOL_MIN_BATCH, get_encoder_pool, reset_encoder_pool
+from rag.quantize import pack_rows, unpack_rows
+
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 _model = None
+_model_lock = threading.Lock()
+_model_error = ""
+_warmup_thread: Optional[threading.Thread] = None
+# Packed (data, scales) rows per text; see rag.quantize for the EMBEDDING_STORAGE modes.
+_memo: "OrderedDict[str, Tuple[np.ndarray, Optional[np.ndarray]]]" = OrderedDict()
+_memo_lock = threading.Lock()
 
 
-def get_embedder() -> SentenceTransformer:
-    global _model
+def get_embedder() -> "SentenceTransformer":
+    global _model, _model_error
     if _model is None:
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
+        with _model_lock:
+            if _model is None:
+                try:
+                    # Imported here so processes that never embed skip loading torch; a missing or
+                    # broken torch install is reported through embedder_status() like a load failure.
+                    from sentence_transformers import SentenceTransformer
+
+                    _model = SentenceTransformer(EMBEDDING_MODEL)
+                    _model_error = ""
+                except Exception as exc:
+                    _model_error = str(exc) or type(exc).__name__
+                    raise
     return _model
 
 
-@lru_cache(maxsize=4096)
-def _embed_one(text: str) -> tuple:
-    vec = get_embedder().encode([text], normalize_embeddings=True)[0]
-    return tuple(float(v) for v in vec)
+def _warm_embedder() -> None:
+    try:
+        get_embedder().encode(["warmup"], show_progress_bar=False)
+    except Exception:  # noqa: BLE001 - surfaced through embedder_status()
+        pass
+
+
+def warm_embedder_async() -> threading.Thread:
+    """Load the embedding model in a background thread; safe to call more than once."""
+    global _warmup_thread
+    with _model_lock:
+        if _warmup_thread is None or (not _warmup_thread.is_alive() and _model is None):
+            _warmup_thread = threading.Thread(target=_warm_embedder, name="embedder-warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def embedder_status() -> Dict[str, object]:
+    loading = _warmup_thread is not None and _warmup_thread.is_alive()
+    return {
+        "model": EMBEDDING_MODEL,
+        "ready": _model is not None,
+        "loading": loading,
+        "error": _model_error,
+    }
+
+
+def _memo_get(text: str) -> Optional[np.ndarray]:
+    with _memo_lock:
+        packed = _memo.get(text)
+        if packed is None:
+            return None
+        _memo.move_to_end(text)
+    return unpack_rows(*packed)[0]
+
+
+def _memo_put(text: str, vec: np.ndarray) -> np.ndarray:
+    """Memoize `vec` in the packed storage mode and return the vector as stored."""
+    packed = pack_rows(vec)
+    with _memo_lock:
+        _memo[text] = packed
+        _memo.move_to_end(text)
+        while len(_memo) > EMBED_CACHE_SIZE:
+            _memo.popitem(last=False)
+    return unpack_rows(*packed)[0]
+
+
+def _encode_batch(texts: List[str], batch_size: int) -> np.ndarray:
+    if len(texts) >= EMBED_POOL_MIN_BATCH:
+        pool = get_encoder_pool(EMBEDDING_MODEL, EMBEDDING_DIM)
+        if pool is not None:
+            # Large uploads are sharded across worker processes so this API worker stays responsive.
+            try:
+                return pool.encode(texts, batch_size)
+            except BrokenProcessPool:
+                # a worker died; replace the pool next time and encode this batch here
+                reset_encoder_pool(pool)
+    return get_embedder().encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+
+
+def _load_from_store(texts: List[str]) -> Dict[str, np.ndarray]:
+    store = get_embedding_store(EMBEDDING_DIM)
+    if store is None:
+        return {}
+    keys = {content_key(EMBEDDING_MODEL, text): text for text in texts}
+    try:
+        found = store.get_many(keys)
+    except (OSError, sqlite3.Error):
+        return {}
+    return {keys[key]: vec for key, vec in found.items()}
+
+
+def _save_to_store(vectors: Dict[str, np.ndarray]) -> None:
+    store = get_embedding_store(EMBEDDING_DIM)
+    if store is None:
+        return
+    try:
+        store.put_many({content_key(EMBEDDING_MODEL, text): np.asarray(vec, dtype=np.float32) for text, vec in vectors.items()})
+    except (OSError, sqlite3.Error):
+        # The disk store is a best-effort cache; a locked or unwritable store must not fail embedding.
+        pass
+
+
+def embed(texts: Iterable[str], batch_size: Optional[int] = None) -> np.ndarray:
+    """
+    Embed texts with per-text memoization.
+
+    Lookups go to the in-process LRU first, then the shared on-disk store.
+    Remaining misses are encoded together in batches of `batch_size`
+    (default `EMBED_BATCH_SIZE`) instead of one forward pass per text.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+
+    resolved: Dict[str, np.ndarray] = {}
+    misses: List[str] = []
+    for text in texts:
+        if text in resolved:
+            continue
+        vec = _memo_get(text)
+        if vec is None:
+            misses.append(text)
+            resolved[text] = None
+        else:
+            resolved[text] = vec
+
+    if misses:
+        for text, vec in _load_from_store(misses).items():
+            resolved[text] = _memo_put(text, vec)
+        misses = [text for text in misses if resolved[text] is None]
 
+    if misses:
+        encoded = np.asarray(_encode_batch(misses, max(1, batch_size or EMBED_BATCH_SIZE)), dtype=np.float32)
+        computed: Dict[str, np.ndarray] = {}
+        for text, row in zip(misses, encoded):
+            computed[text] = row
+            resolved[text] = _memo_put(text, row)
+        _save_to_store(computed)
 
-def embed(texts: Iterable[str]) -> np.ndarray:
-    vectors: List[tuple] = [_embed_one(t) for t in texts]
-    if not vectors:
-        return np.empty((0, 384), dtype=np.float32)
-    return np.array(vectors, dtype=np.float32)
+    return np.array([resolved[t] for t in texts], dtype=np.float32).reshape(len(texts), EMBEDDING_DIM)
@@ -0,0 +1,128 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+# 0 disables the pool; large batches then encode in the calling thread.
+EMBED_POOL_WORKERS = int(os.getenv("EMBED_POOL_WORKERS", "0"))
+# Below this many cache misses the process hop costs more than it saves.
+EMBED_POOL_MIN_BATCH = int(os.getenv("EMBED_POOL_MIN_BATCH", "512"))
+
+_worker_model = None
+
+
+def load_sentence_transformer(model_name: str):
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def _init_worker(model_name: str, loader: Callable, threads: int) -> None:
+    global _worker_model
+    try:
+        import torch
+
+        torch.set_num_threads(max(1, threads))
+    except ImportError:
+        pass
+    _worker_model = loader(model_name)
+
+
+def _encode_shard(shm_name: str, shape: Tuple[int, int], start: int, texts: List[str], batch_size: int) -> int:
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        out[start:start + len(texts)] = _worker_model.encode(
+            texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        del out
+    finally:
+        shm.close()
+    return len(texts)
+
+
+def _shard_bounds(count: int, shards: int) -> List[Tuple[int, int]]:
+    shards = max(1, min(shards, count))
+    step, extra = divmod(count, shards)
+    bounds: List[Tuple[int, int]] = []
+    start = 0
+    for index in range(shards):
+        end = start + step + (1 if index < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+class EncoderPool:
+    """
+    Long-lived worker processes, each holding its own copy of the embedding model.
+
+    A batch is split into shards that workers encode in parallel, writing rows
+    straight into one shared-memory float32 matrix instead of pickling results back.
+    """
+
+    def __init__(self, workers: int, model_name: str, dim: int, loader: Callable = load_sentence_transformer):
+        self.workers = max(1, workers)
+        self.dim = dim
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, loader, threads),
+        )
+
+    def encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        if not texts:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        shape = (len(texts), self.dim)
+        shm = shared_memory.SharedMemory(create=True, size=len(texts) * self.dim * 4)
+        try:
+            futures = [
+                self._executor.submit(_encode_shard, shm.name, shape, start, texts[start:end], batch_size)
+                for start, end in _shard_bounds(len(texts), self.workers * 2)
+            ]
+            for future in futures:
+                future.result()
+            return np.array(np.ndarray(shape, dtype=np.float32, buffer=shm.buf))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: Optional[EncoderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_encoder_pool(model_name: str, dim: int) -> Optional[EncoderPool]:
+    """Process-wide pool, or None when EMBED_POOL_WORKERS is 0."""
+    global _pool
+    if EMBED_POOL_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = EncoderPool(EMBED_POOL_WORKERS, model_name, dim)
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def reset_encoder_pool(pool: EncoderPool) -> None:
+    """Drop `pool` (e.g. after a worker died and broke it); the next large batch starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown()
@@ -0,0 +1,62 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are as at be by can for from has have in into is it its of on or should "
+    "that the their them then there these this to was were will with".split()
+)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in STOP_WORDS]
+
+
+def term_frequencies(text: str) -> Dict[str, int]:
+    """Per-chunk term counts; stored on each chunk so the inverted index needs no re-tokenizing."""
+    return dict(Counter(tokenize(text)))
+
+
+class LexicalIndex:
+    """BM25 over an inverted index assembled from the chunks' precomputed term counts."""
+
+    def __init__(self, doc_terms: List[Dict[str, int]]):
+        self.size = len(doc_terms)
+        self.doc_lengths = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float32)
+        self.avg_length = float(self.doc_lengths.mean()) if self.size else 0.0
+
+        postings: Dict[str, List[tuple]] = {}
+        for doc, terms in enumerate(doc_terms):
+            for term, count in terms.items():
+                postings.setdefault(term, []).append((doc, count))
+
+        self.postings: Dict[str, tuple] = {}
+        for term, entries in postings.items():
+            docs = np.array([doc for doc, _ in entries], dtype=np.int64)
+            counts = np.array([count for _, count in entries], dtype=np.float32)
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.postings[term] = (docs, counts, idf)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict]) -> "LexicalIndex":
+        return cls([chunk.get("terms") or term_frequencies(chunk.get("text", "")) for chunk in chunks])
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        if not self.size:
+            return scores
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths / (self.avg_length or 1.0))
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            docs, counts, idf = posting
+            scores[docs] += idf * counts * (BM25_K1 + 1) / (counts + norm[docs])
+        return scores
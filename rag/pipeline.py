@@ -1,6 +1,68 @@
+import hashlib
+import os
+from typing import Dict, List, Optional, Sequence, Union
 
-from rag.embeddings import embed
+from llms.tokens import estimate_tokens
+from rag.retriever import retrieve_top_k
 
-def build_rag_context(chunks):
-    embed(chunks)
-    return "\n".join(chunks)
+
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+
+Chunk = Union[str, Dict[str, str]]
+
+
+def _as_chunk_dicts(chunks: Sequence[Chunk]) -> List[Dict[str, str]]:
+    normalized: List[Dict[str, str]] = []
+    for chunk in chunks:
+        if isinstance(chunk, dict):
+            normalized.append(chunk)
+            continue
+        digest = hashlib.sha1(str(chunk).encode("utf-8")).hexdigest()[:10]
+        normalized.append({"chunk_id": f"C-{digest}", "text": str(chunk)})
+    return normalized
+
+
+def assemble_context(
+    chunks: Sequence[Chunk],
+    query: str = "",
+    token_budget: Optional[int] = None,
+    separator: str = "\n",
+) -> Dict:
+    """
+    Pack the most relevant chunks into a prompt context under a token budget.
+
+    Chunks are ranked by relevance to `query` (source order when there is no query)
+    and added greedily while they fit; the packed chunks keep their source order.
+    Returns the context text plus token accounting, including `saved_tokens`
+    versus sending every chunk.
+    """
+    budget = RAG_CONTEXT_TOKEN_BUDGET if token_budget is None else max(0, token_budget)
+    chunk_dicts = _as_chunk_dicts(chunks)
+    costs = {id(chunk): estimate_tokens(chunk["text"]) for chunk in chunk_dicts}
+    separator_cost = estimate_tokens(separator)
+    total_tokens = sum(costs.values()) + separator_cost * max(0, len(chunk_dicts) - 1)
+
+    ranked = retrieve_top_k(chunk_dicts, query, k=len(chunk_dicts)) if query.strip() and chunk_dicts else chunk_dicts
+
+    selected_ids = set()
+    used_tokens = 0
+    for chunk in ranked:
+        cost = costs[id(chunk)] + (separator_cost if selected_ids else 0)
+        if used_tokens + cost > budget:
+            continue
+        selected_ids.add(id(chunk))
+        used_tokens += cost
+
+    selected = [chunk for chunk in chunk_dicts if id(chunk) in selected_ids]
+    return {
+        "text": separator.join(chunk["text"] for chunk in selected),
+        "chunk_ids": [chunk["chunk_id"] for chunk in selected],
+        "tokens": used_tokens,
+        "token_budget": budget,
+        "total_tokens": total_tokens,
+        "saved_tokens": total_tokens - used_tokens,
+    }
+
+
+def build_rag_context(chunks: Sequence[Chunk], query: str = "", token_budget: Optional[int] = None) -> str:
+    return assemble_context(chunks, query=query, token_budget=token_budget)["text"]
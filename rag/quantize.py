@@ -0,0 +1,106 @@
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+# float32 keeps full precision; float16 halves memory; int8 stores one byte per
+# dimension plus a per-row scale (~4x smaller than float32).
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float16").strip().lower()
+STORAGE_MODES = ("float32", "float16", "int8")
+DOT_BLOCK_ROWS = 4096
+
+
+def _resolve_mode(mode: Optional[str]) -> str:
+    mode = (mode or EMBEDDING_STORAGE).strip().lower()
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unsupported embedding storage mode: {mode}")
+    return mode
+
+
+def pack_rows(matrix: np.ndarray, mode: Optional[str] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Pack float vectors row-wise; int8 uses symmetric per-row scales."""
+    mode = _resolve_mode(mode)
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    if mode == "float32":
+        return np.ascontiguousarray(matrix), None
+    if mode == "float16":
+        return np.ascontiguousarray(matrix.astype(np.float16)), None
+
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    data = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return np.ascontiguousarray(data), scales.astype(np.float32)
+
+
+def unpack_rows(data: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    unpacked = np.asarray(data, dtype=np.float32)
+    if scales is not None:
+        unpacked = unpacked * np.asarray(scales, dtype=np.float32).reshape(-1, 1)
+    return unpacked
+
+
+class PackedVectors:
+    """A contiguous packed embedding matrix that scores queries without a float32 copy."""
+
+    def __init__(self, data: np.ndarray, scales: Optional[np.ndarray] = None):
+        self.data = np.ascontiguousarray(data)
+        self.scales = scales
+
+    @classmethod
+    def from_float32(cls, matrix: np.ndarray, mode: Optional[str] = None) -> "PackedVectors":
+        return cls(*pack_rows(matrix, mode))
+
+    @property
+    def mode(self) -> str:
+        return "int8" if self.scales is not None else str(self.data.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape
+
+    def rows(self, indices) -> np.ndarray:
+        scales = self.scales[indices] if self.scales is not None else None
+        return unpack_rows(self.data[indices], scales)
+
+    def to_float32(self) -> np.ndarray:
+        return unpack_rows(self.data, self.scales)
+
+    def dot(self, queries: np.ndarray) -> np.ndarray:
+        """Scores `queries @ vectors.T`, widening one block of rows at a time."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if self.data.dtype == np.float32:
+            return queries @ self.data.T
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), DOT_BLOCK_ROWS):
+            block = self.data[start:start + DOT_BLOCK_ROWS].astype(np.float32)
+            block_scores = queries @ block.T
+            if self.scales is not None:
+                block_scores *= self.scales[start:start + DOT_BLOCK_ROWS]
+            scores[:, start:start + DOT_BLOCK_ROWS] = block_scores
+        return scores
+
+
+def storage_accuracy(matrix: np.ndarray, queries: np.ndarray, mode: str, k: int = 5) -> Dict[str, float]:
+    """Compare a packed mode against float32: score error and top-k overlap for `queries`."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    exact = queries @ matrix.T
+    approx = PackedVectors.from_float32(matrix, mode).dot(queries)
+    k = max(1, min(k, matrix.shape[0]))
+    exact_top = np.argsort(-exact, axis=1)[:, :k]
+    approx_top = np.argsort(-approx, axis=1)[:, :k]
+    overlap = sum(len(set(a) & set(e)) for a, e in zip(approx_top.tolist(), exact_top.tolist()))
+    return {
+        "max_abs_error": float(np.abs(exact - approx).max()),
+        "mean_abs_error": float(np.abs(exact - approx).mean()),
+        "recall_at_k": overlap / (k * len(queries)),
+        "bytes_ratio": PackedVectors.from_float32(matrix, mode).nbytes / matrix.nbytes,
+    }
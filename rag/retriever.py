@@ -1,10 +1,24 @@
 import hashlib
+import os
+import threading
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
 from rag.embeddings import embed
+from rag.lexical import LexicalIndex
+from rag.quantize import PackedVectors
+from rag.vector_store import FlatIPBackend, build_index, top_k
+
+
+RAG_INDEX_CACHE_SIZE = int(os.getenv("RAG_INDEX_CACHE_SIZE", "32"))
+# Hybrid fusion: weight * cosine similarity + weight * (BM25 / best BM25 for the query).
+RAG_DENSE_WEIGHT = float(os.getenv("RAG_DENSE_WEIGHT", "0.7"))
+RAG_LEXICAL_WEIGHT = float(os.getenv("RAG_LEXICAL_WEIGHT", "0.3"))
+# Candidates per query pulled from each side before fusing when the dense backend is approximate.
+RAG_HYBRID_OVERSAMPLE = int(os.getenv("RAG_HYBRID_OVERSAMPLE", "4"))
 
 
 def _chunks_signature(chunks: List[Dict[str, str]]) -> str:
@@ -12,23 +26,193 @@ def _chunks_signature(chunks: List[Dict[str, str]]) -> str:
     return hashlib.sha1(ids.encode("utf-8")).hexdigest()
 
 
+class ChunkIndex:
+    """
+    Normalized chunk embeddings for one document, built once and queried many times.
+
+    Vectors are held packed in the EMBEDDING_STORAGE mode (float16 by default) and
+    scored on the packed form.
+
+    Search goes through a `rag.vector_store` backend: exact flat inner product for
+    small documents, HNSW once the chunk count passes RAG_ANN_THRESHOLD (if set). When query
+    text is supplied, dense scores are fused with BM25 scores from the chunks'
+    lexical index.
+    """
+
+    def __init__(
+        self,
+        signature: str,
+        chunk_ids: Tuple[str, ...],
+        matrix: np.ndarray,
+        lexical: Optional[LexicalIndex] = None,
+        backend: Optional[str] = None,
+    ):
+        self.signature = signature
+        self.chunk_ids = chunk_ids
+        self.vectors = matrix if isinstance(matrix, PackedVectors) else PackedVectors.from_float32(matrix)
+        self.lexical = lexical
+        self.backend = build_index(self.vectors, backend=backend, signature=signature)
+
+    @classmethod
+    def build(cls, chunks: List[Dict[str, str]], signature: Optional[str] = None) -> "ChunkIndex":
+        matrix = embed(c["text"] for c in chunks)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1.0, norms)
+        return cls(
+            signature or _chunks_signature(chunks),
+            tuple(c["chunk_id"] for c in chunks),
+            matrix,
+            lexical=LexicalIndex.from_chunks(chunks),
+        )
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def search(self, query_vec: np.ndarray, k: int, query: Optional[str] = None, **weights) -> List[Tuple[str, float]]:
+        queries = [query] if query is not None else None
+        return self.search_many(np.asarray(query_vec, dtype=np.float32).reshape(1, -1), k, queries, **weights)[0]
+
+    def search_many(
+        self,
+        query_matrix: np.ndarray,
+        k: int,
+        queries: Optional[List[str]] = None,
+        dense_weight: Optional[float] = None,
+        lexical_weight: Optional[float] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Top-k for every query row in one backend call (a single matrix multiply for flat search)."""
+        query_matrix = np.atleast_2d(np.asarray(query_matrix, dtype=np.float32))
+        if not len(self) or not len(query_matrix):
+            return [[] for _ in range(len(query_matrix))]
+
+        dense_weight = RAG_DENSE_WEIGHT if dense_weight is None else dense_weight
+        lexical_weight = RAG_LEXICAL_WEIGHT if lexical_weight is None else lexical_weight
+        if queries is None or self.lexical is None or lexical_weight <= 0:
+            scores, indices = self.backend.search(query_matrix, k)
+        else:
+            scores, indices = self._hybrid_search(query_matrix, queries, k, dense_weight, lexical_weight)
+        return [
+            [(self.chunk_ids[i], float(s)) for s, i in zip(row_scores, row_indices) if i >= 0]
+            for row_scores, row_indices in zip(scores, indices)
+        ]
+
+    def _lexical_scores(self, query: str) -> np.ndarray:
+        scores = self.lexical.scores(query)
+        best = float(scores.max()) if len(scores) else 0.0
+        return scores / best if best > 0 else scores
+
+    def _hybrid_search(
+        self,
+        query_matrix: np.ndarray,
+        queries: List[str],
+        k: int,
+        dense_weight: float,
+        lexical_weight: float,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        lexical = np.vstack([self._lexical_scores(q) for q in queries])
+        if isinstance(self.backend, FlatIPBackend):
+            fused = dense_weight * self.vectors.dot(query_matrix) + lexical_weight * lexical
+            return top_k(fused, k)
+
+        # Approximate backend: fuse exactly over the union of dense and lexical candidates.
+        pool = min(len(self), max(k, k * RAG_HYBRID_OVERSAMPLE))
+        _, dense_candidates = self.backend.search(query_matrix, pool)
+        lexical_candidates = np.argpartition(-lexical, pool - 1, axis=1)[:, :pool]
+        k = min(k, len(self))
+        all_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        all_indices = np.full((len(queries), k), -1, dtype=np.int64)
+        for row, query_vec in enumerate(query_matrix):
+            candidates = np.union1d(dense_candidates[row][dense_candidates[row] >= 0], lexical_candidates[row])
+            fused = dense_weight * (self.vectors.rows(candidates) @ query_vec) + lexical_weight * lexical[row, candidates]
+            row_scores, order = top_k(fused.reshape(1, -1), k)
+            all_scores[row, : order.shape[1]] = row_scores[0]
+            all_indices[row, : order.shape[1]] = candidates[order[0]]
+        return all_scores, all_indices
+
+
+_indexes: "OrderedDict[str, ChunkIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_chunk_index(chunks: List[Dict[str, str]]) -> ChunkIndex:
+    """Return the cached index for these chunks, building it on first use (LRU by signature)."""
+    signature = _chunks_signature(chunks)
+    with _indexes_lock:
+        index = _indexes.get(signature)
+        if index is not None:
+            _indexes.move_to_end(signature)
+            return index
+
+    index = ChunkIndex.build(chunks, signature)
+    with _indexes_lock:
+        _indexes[signature] = index
+        _indexes.move_to_end(signature)
+        while len(_indexes) > RAG_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
 @lru_cache(maxsize=256)
-def _query_scores(signature: str, query: str, k: int, chunk_texts: tuple, chunk_ids: tuple) -> tuple:
-    chunk_vectors = embed(chunk_texts)
-    query_vec = embed([query])
-    scores = np.dot(chunk_vectors, query_vec.T).flatten()
-    top_indices = scores.argsort()[-k:][::-1]
-    return tuple((chunk_ids[i], float(scores[i])) for i in top_indices)
+def _query_scores(signature: str, query: str, k: int, dense_weight: float, lexical_weight: float) -> tuple:
+    with _indexes_lock:
+        index = _indexes.get(signature)
+    if index is None:
+        raise KeyError(signature)
+    return tuple(index.search(embed([query])[0], k, query, dense_weight=dense_weight, lexical_weight=lexical_weight))
 
 
-def retrieve_top_k(chunks: List[Dict[str, str]], query: str, k: int = 5) -> List[Dict[str, str]]:
+def retrieve_top_k(
+    chunks: List[Dict[str, str]],
+    query: str,
+    k: int = 5,
+    dense_weight: Optional[float] = None,
+    lexical_weight: Optional[float] = None,
+) -> List[Dict[str, str]]:
     if not chunks:
         return []
     bounded_k = max(1, min(k, len(chunks)))
-    signature = _chunks_signature(chunks)
-    chunk_texts = tuple(c["text"] for c in chunks)
-    chunk_ids = tuple(c["chunk_id"] for c in chunks)
+    index = get_chunk_index(chunks)
+    query = query.strip().lower()
+    dense_weight = RAG_DENSE_WEIGHT if dense_weight is None else dense_weight
+    lexical_weight = RAG_LEXICAL_WEIGHT if lexical_weight is None else lexical_weight
 
-    ranked = _query_scores(signature, query.strip().lower(), bounded_k, chunk_texts, chunk_ids)
+    try:
+        ranked = _query_scores(index.signature, query, bounded_k, dense_weight, lexical_weight)
+    except KeyError:
+        # evicted between build and lookup; score directly without memoizing
+        ranked = index.search(embed([query])[0], bounded_k, query, dense_weight=dense_weight, lexical_weight=lexical_weight)
     id_map = {c["chunk_id"]: c for c in chunks}
     return [id_map[cid] for cid, _ in ranked if cid in id_map]
+
+
+def retrieve_top_k_batch(
+    chunks: List[Dict[str, str]],
+    queries: List[str],
+    k: int = 5,
+    dense_weight: Optional[float] = None,
+    lexical_weight: Optional[float] = None,
+) -> List[List[Dict[str, str]]]:
+    """
+    Retrieve the top-k chunks for many queries at once.
+
+    All queries are embedded in one batch and scored against the chunk matrix in
+    one search call; results are returned in query order.
+    """
+    if not queries:
+        return []
+    if not chunks:
+        return [[] for _ in queries]
+    bounded_k = max(1, min(k, len(chunks)))
+    index = get_chunk_index(chunks)
+
+    queries = [q.strip().lower() for q in queries]
+    query_matrix = embed(queries)
+    id_map = {c["chunk_id"]: c for c in chunks}
+    ranked_rows = index.search_many(
+        query_matrix,
+        bounded_k,
+        queries,
+        dense_weight=dense_weight,
+        lexical_weight=lexical_weight,
+    )
+    return [[id_map[cid] for cid, _ in ranked if cid in id_map] for ranked in ranked_rows]
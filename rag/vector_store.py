@@ -1,8 +1,129 @@
-import faiss
+import os
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
 import numpy as np
 
-def build_index(embeddings):
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(np.array(embeddings))
-    return index
+from rag.quantize import PackedVectors
+
+try:
+    import faiss
+except ImportError:  # pragma: no cover - faiss-cpu is optional at runtime
+    faiss = None
+
+
+# Chunk count at which retrieval switches from exact flat search to HNSW; 0 keeps flat
+# search at every size. Flat is the default because in `python -m rag.benchmark` HNSW
+# (efSearch=512) only reaches ~0.94 recall@5 at 50k chunks, below the 0.95 target, while
+# flat search stays under ~3.5 ms/query. Set this to the benchmark's suggested value.
+RAG_ANN_THRESHOLD = int(os.getenv("RAG_ANN_THRESHOLD", "0"))
+RAG_HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+RAG_HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "512"))
+RAG_INDEX_DIR = Path(os.getenv("RAG_INDEX_DIR") or (Path.cwd() / "saved_workspaces" / ".indexes"))
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    k = max(1, min(k, scores.shape[1]))
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+
+class FlatIPBackend:
+    """Exact inner-product search over a contiguous normalized (optionally packed) matrix."""
+
+    name = "flat"
+
+    def __init__(self, vectors: Union[np.ndarray, PackedVectors]):
+        if not isinstance(vectors, PackedVectors):
+            vectors = PackedVectors.from_float32(vectors, "float32")
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return top_k(self.vectors.dot(queries), k)
+
+
+class HNSWBackend:
+    """Approximate inner-product search through a FAISS HNSW graph."""
+
+    name = "hnsw"
+
+    def __init__(self, index):
+        self.index = index
+        self.index.hnsw.efSearch = RAG_HNSW_EF_SEARCH
+
+    @classmethod
+    def build(cls, matrix: np.ndarray) -> "HNSWBackend":
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        index = faiss.IndexHNSWFlat(matrix.shape[1], RAG_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.add(matrix)
+        return cls(index)
+
+    @classmethod
+    def load(cls, path: Path) -> "HNSWBackend":
+        return cls(faiss.read_index(str(path)))
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        faiss.write_index(self.index, str(tmp_path))
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        k = max(1, min(k, len(self)))
+        scores, indices = self.index.search(queries, k)
+        return scores, indices
+
+
+def ann_available() -> bool:
+    return faiss is not None
+
+
+def build_index(
+    embeddings: Union[np.ndarray, PackedVectors],
+    backend: Optional[str] = None,
+    signature: Optional[str] = None,
+):
+    """
+    Build the retrieval backend for a chunk matrix.
+
+    `backend` is "flat", "hnsw" or None for automatic selection by RAG_ANN_THRESHOLD
+    (flat when it is 0).
+    HNSW indexes are persisted under RAG_INDEX_DIR by `signature` and reloaded on later builds.
+    """
+    if backend is None:
+        use_ann = ann_available() and RAG_ANN_THRESHOLD > 0 and len(embeddings) >= RAG_ANN_THRESHOLD
+        backend = "hnsw" if use_ann else "flat"
+    if backend == "flat":
+        return FlatIPBackend(embeddings)
+    if backend != "hnsw":
+        raise ValueError(f"Unknown retrieval backend: {backend}")
+    if not ann_available():
+        raise RuntimeError("faiss is required for the hnsw retrieval backend")
+
+    path = RAG_INDEX_DIR / f"{signature}.hnsw" if signature else None
+    if path is not None and path.exists():
+        try:
+            loaded = HNSWBackend.load(path)
+            if len(loaded) == len(embeddings):
+                return loaded
+        except RuntimeError:
+            pass
+
+    if isinstance(embeddings, PackedVectors):
+        embeddings = embeddings.to_float32()
+    built = HNSWBackend.build(embeddings)
+    if path is not None:
+        try:
+            built.save(path)
+        except (OSError, RuntimeError):
+            pass
+    return built
@@ -427,3 +427,17 @@ def test_generate_code_for_story_retries_when_validation_finds_placeholder_outpu
 
     assert "frontend/src/App.jsx" in files
     assert "TODO" not in files["frontend/src/App.jsx"]
+
+
+def test_llm_fallback_is_only_counted_when_a_retry_prompt_is_sent():
+    from codegen.code_generator import MAX_PARSE_RETRIES, generate_tests_for_story
+    from llms.json_repair import repair_stats
+
+    before = repair_stats()["llm_fallback"]
+
+    with patch("codegen.code_generator._invoke_code_model", return_value="not json at all") as invoke:
+        result = generate_tests_for_story({"summary": "Login", "description": "Users log in"})
+
+    assert invoke.call_count == MAX_PARSE_RETRIES + 1
+    assert "ERROR.txt" in result["unit_test_files"]
+    assert repair_stats()["llm_fallback"] - before == MAX_PARSE_RETRIES
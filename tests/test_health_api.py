@@ -0,0 +1,27 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app.backend.api import app
+
+
+client = TestClient(app)
+
+
+def test_health_ready_reports_503_until_embedder_loaded(monkeypatch):
+    status = {"model": "all-MiniLM-L6-v2", "ready": False, "loading": True, "error": ""}
+    monkeypatch.setattr("app.backend.services.get_embedding_readiness", lambda: dict(status))
+
+    starting = client.get("/health/ready")
+    status["ready"] = True
+    ready = client.get("/health/ready")
+
+    assert starting.status_code == 503
+    assert starting.json()["status"] == "starting"
+    assert ready.status_code == 200
+    assert ready.json()["embedder"]["ready"] is True
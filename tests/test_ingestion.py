@@ -0,0 +1,131 @@
+import io
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from ingestion import loader
+from ingestion.chunker import chunk_requirements, chunking_report, iter_chunks
+
+
+def _upload(name: str, content: bytes) -> io.BytesIO:
+    handle = io.BytesIO(content)
+    handle.name = name
+    return handle
+
+
+def test_chunk_requirements_accepts_page_stream_with_same_ids():
+    pages = ["Epic: Billing\nUsers pay invoices", "Users download receipts\nModule: Reports"]
+
+    streamed = chunk_requirements(iter(pages), max_lines=5)
+    joined = chunk_requirements("\n".join(pages), max_lines=5)
+
+    assert streamed == joined
+    assert [c["chunk_id"] for c in streamed] == [c["chunk_id"] for c in joined]
+
+
+def test_iter_requirements_streams_pdf_pages_in_order(monkeypatch):
+    class FakePage:
+        def __init__(self, index):
+            self.index = index
+
+        def extract_text(self):
+            return f"page {self.index}"
+
+    class FakeReader:
+        def __init__(self, path):
+            self.pages = [FakePage(i) for i in range(5)]
+
+    monkeypatch.setattr(loader, "PdfReader", FakeReader)
+    monkeypatch.setattr(loader, "PDF_PAGES_PER_TASK", 2)
+
+    pages = list(loader.iter_pdf_pages(_upload("spec.pdf", b"%PDF-1.4"), workers=1))
+
+    assert pages == [f"page {i}" for i in range(5)]
+
+
+def _text_pdf(page_texts: list) -> bytes:
+    """Minimal valid PDF with one line of Helvetica text per page."""
+    count = len(page_texts)
+    font_id = 3 + 2 * count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(count)) + b"] /Count %d >>" % count,
+    ]
+    for index, text in enumerate(page_texts):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 %d 0 R >> >> "
+            b"/Contents %d 0 R >>" % (font_id, 4 + 2 * index)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def test_pdf_pages_extracted_across_worker_processes_match_serial_order(monkeypatch):
+    content = _text_pdf([f"Requirement page {i}" for i in range(7)])
+    monkeypatch.setattr(loader, "PDF_PAGES_PER_TASK", 2)
+    monkeypatch.setattr(loader, "PDF_EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(loader, "_pdf_pool", None)
+
+    serial = list(loader.iter_pdf_pages(_upload("spec.pdf", content), workers=1))
+    try:
+        parallel = list(loader.iter_pdf_pages(_upload("spec.pdf", content), workers=2))
+    finally:
+        if loader._pdf_pool is not None:
+            loader._pdf_pool.shutdown()
+
+    assert loader._pdf_pool is not None
+    assert [page.strip() for page in serial] == [f"Requirement page {i}" for i in range(7)]
+    assert parallel == serial
+
+
+def test_csv_rows_are_built_column_wise_with_allowlist():
+    content = b"id,title,notes,owner\n1,Login,,ann\n2,Export,CSV only,bob\n3,Audit,logs,cy\n"
+
+    rows = list(loader.iter_csv_rows(_upload("backlog.csv", content), chunksize=2))
+    narrow = list(loader.iter_csv_rows(_upload("backlog.csv", content), columns=["title", "notes", "missing"]))
+
+    assert rows == ["1 | Login | nan | ann", "2 | Export | CSV only | bob", "3 | Audit | logs | cy"]
+    assert narrow == ["Login | nan", "Export | CSV only", "Audit | logs"]
+
+
+def test_iter_chunks_yields_before_input_is_exhausted():
+    consumed = []
+
+    def lines():
+        for line in ["Feature: Search", "Find by name", "Find   by\ttag", "Module: Export", "CSV export"]:
+            consumed.append(line)
+            yield line
+
+    stream = iter_chunks(lines(), max_lines=5)
+    first = next(stream)
+
+    assert first["text"] == "Feature: Search"
+    assert consumed == ["Feature: Search"]
+    rest = list(stream)
+    assert [c["text"] for c in rest] == ["Find by name\nFind by tag\nModule: Export", "CSV export"]
+    assert [first] + rest == chunk_requirements("\n".join(consumed))
+
+
+def test_token_budget_packs_short_lines_and_keeps_semantic_breaks():
+    text = "\n".join(["Epic: Accounts"] + [f"- user can edit field {i}" for i in range(12)] + ["Module: Billing", "- pay invoice"])
+
+    by_lines = chunk_requirements(text, max_lines=5)
+    by_tokens = chunk_requirements(text, max_tokens=200)
+
+    assert [c["text"].splitlines()[-1] for c in by_tokens] == ["Epic: Accounts", "Module: Billing", "- pay invoice"]
+    assert len(by_tokens) < len(by_lines)
+    assert chunking_report(by_tokens)["estimated_prompt_tokens"] < chunking_report(by_lines)["estimated_prompt_tokens"]
+    assert chunking_report(by_tokens)["chunk_count"] == 3
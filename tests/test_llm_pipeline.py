@@ -0,0 +1,466 @@
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from llms import epic_pipeline
+
+
+def test_generate_epics_runs_chunks_concurrently_in_source_order(monkeypatch):
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def fake_generate(chunk):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        # later chunks finish first, so completion order differs from source order
+        time.sleep(0.02 * (6 - int(chunk["chunk_id"])))
+        with lock:
+            active["now"] -= 1
+        return [{"epic_name": f"Epic {chunk['chunk_id']}", "source_chunk_ids": [chunk["chunk_id"]]}]
+
+    monkeypatch.setattr(epic_pipeline, "generate_epics_from_chunk", fake_generate)
+    chunks = [{"chunk_id": str(i), "text": f"chunk {i}"} for i in range(6)]
+
+    epics = epic_pipeline.generate_epics_from_requirements(chunks, max_in_flight=3)
+
+    assert [epic["epic_name"] for epic in epics] == [f"Epic {i}" for i in range(6)]
+    assert active["peak"] == 3
+
+
+def test_scheduler_queues_requests_past_the_per_minute_budget():
+    from llms.scheduler import RateLimitScheduler
+
+    scheduler = RateLimitScheduler({"m": (60, 1000)})
+
+    assert scheduler.reserve("m", 900) == 0
+    # 900 of 1000 tokens are spent; the next 300-token call waits for 200 tokens at 1000/60 per second
+    assert 11.9 < scheduler.reserve("m", 300) < 12.1
+    assert scheduler.reserve("other", 10**6) == 0
+
+
+def test_run_scheduled_waits_out_retry_after_instead_of_failing(monkeypatch):
+    from llms import scheduler as scheduler_module
+
+    class FakeRateLimitError(Exception):
+        status_code = 429
+
+        class response:
+            headers = {"retry-after": "7"}
+
+    sleeps = []
+    monkeypatch.setattr(scheduler_module.time, "sleep", sleeps.append)
+    monkeypatch.setattr(scheduler_module, "_scheduler", scheduler_module.RateLimitScheduler())
+    monkeypatch.setenv("LLM_SCHEDULER_ENABLED", "true")
+    outcomes = iter([FakeRateLimitError(), "ok"])
+
+    def call():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler_module.run_scheduled("m", "prompt", call) == "ok"
+    assert len(sleeps) == 1 and 6.9 < sleeps[0] <= 7
+
+
+def test_rate_limits_are_retried_by_one_layer_only(monkeypatch):
+    import pytest
+
+    from llms import epic_llm
+    from llms import scheduler as scheduler_module
+
+    class FakeRateLimitError(Exception):
+        status_code = 429
+
+    calls = []
+
+    class FakeCompletions:
+        def create(self, **kwargs):
+            calls.append(kwargs)
+            raise FakeRateLimitError()
+
+    class FakeClient:
+        class chat:
+            completions = FakeCompletions()
+
+    # on by default, with no budgets unless LLM_RATE_LIMITS sets them
+    monkeypatch.delenv("LLM_SCHEDULER_ENABLED", raising=False)
+    monkeypatch.setattr(scheduler_module, "_scheduler", None)
+    assert scheduler_module.get_scheduler().reserve("llama-3.3-70b-versatile", 10**6) == 0
+    monkeypatch.setattr(scheduler_module, "LLM_RATE_LIMIT_RETRIES", 2)
+    monkeypatch.setattr(scheduler_module.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(epic_llm.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(epic_llm, "_get_client", lambda: FakeClient())
+
+    with pytest.raises(FakeRateLimitError):
+        epic_llm._complete_with_backoff("prompt", "m", 10)
+
+    assert len(calls) == 3
+
+
+def test_response_cache_expires_evicts_and_skips_invalid_responses(monkeypatch, tmp_path):
+    from llms import response_cache
+
+    cache = response_cache.ResponseCache(tmp_path, ttl=60, max_entries=2)
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    calls = []
+
+    def complete(prompt):
+        calls.append(prompt)
+        return "not json" if prompt == "bad" else f'{{"answer": "{prompt}"}}'
+
+    def cached(prompt, temperature=0.2):
+        return response_cache.cached_completion(
+            "m", prompt, {"temperature": temperature}, lambda: complete(prompt), validate=json.loads
+        )
+
+    assert cached("a") == cached("a") == '{"answer": "a"}'
+    cached("a", temperature=0.9)
+    cached("bad")
+    cached("bad")
+    assert calls == ["a", "a", "bad", "bad"]
+
+    cached("b")
+    assert len(cache) == 2
+    assert cache.get(response_cache.response_cache_key("m", "b", {"temperature": 0.2})) is not None
+
+    cache.ttl = -1
+    assert cache.get(response_cache.response_cache_key("m", "b", {"temperature": 0.2})) is None
+
+
+def test_response_cache_falls_back_to_the_model_when_the_cache_dir_is_unwritable(monkeypatch, tmp_path):
+    import asyncio
+
+    from llms import response_cache
+
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setattr(response_cache, "_cache", response_cache.ResponseCache(blocker / "cache"))
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+
+    async def complete():
+        return "async"
+
+    assert response_cache.cached_completion("m", "p", {}, lambda: "sync") == "sync"
+    assert asyncio.run(response_cache.cached_completion_async("m", "p", {}, complete)) == "async"
+
+
+def test_single_flight_coalesces_concurrent_identical_calls():
+    from llms.single_flight import SingleFlight
+
+    flights = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"stories": ["shared"]}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("epic-1", slow_call)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("epic-1", slow_call))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"stories": ["shared"]}] * 4
+    assert flights.stats() == {"calls": 1, "coalesced": 3, "in_flight": 0}
+    assert flights.do("epic-1", lambda: "fresh") == "fresh"
+
+
+def test_async_single_flight_survives_a_cancelled_leader():
+    import asyncio
+
+    import pytest
+
+    from llms.single_flight import AsyncSingleFlight
+
+    async def scenario():
+        flights = AsyncSingleFlight()
+        started = asyncio.Event()
+        release = asyncio.Event()
+        calls = []
+
+        async def slow_call():
+            calls.append(1)
+            started.set()
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                calls.append("cancelled")
+                raise
+            return "shared"
+
+        leader = asyncio.create_task(flights.do("epic-1", slow_call))
+        await started.wait()
+        follower = asyncio.create_task(flights.do("epic-1", slow_call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await follower == "shared"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert calls == [1]
+
+        # the call is only cancelled once every waiter has left
+        release.clear()
+        alone = asyncio.create_task(flights.do("epic-2", slow_call))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await alone
+        await asyncio.sleep(0)
+        assert calls == [1, 1, "cancelled"]
+        assert flights.stats() == {"calls": 2, "coalesced": 1, "in_flight": 0}
+
+    asyncio.run(scenario())
+
+
+def test_groq_clients_are_pooled_per_api_key():
+    from llms import groq_client
+
+    client = groq_client.get_client("pool-test-key")
+
+    assert groq_client.get_client("pool-test-key") is client
+    assert groq_client.get_client("other-test-key") is not client
+
+
+def test_groq_client_closes_its_http_pool_when_construction_fails(monkeypatch):
+    import pytest
+
+    from llms import groq_client
+
+    closed = []
+
+    class FakeHttpClient:
+        def __init__(self, **kwargs):
+            pass
+
+        def close(self):
+            closed.append(True)
+
+    def failing_groq(**kwargs):
+        raise ValueError("bad configuration")
+
+    monkeypatch.setattr(groq_client.httpx, "Client", FakeHttpClient)
+    monkeypatch.setattr(groq_client, "Groq", failing_groq)
+
+    with pytest.raises(ValueError):
+        groq_client.get_client("broken-test-key")
+
+    assert closed == [True]
+    assert "broken-test-key" not in groq_client._clients
+
+
+def test_async_epic_endpoint_keeps_llm_calls_on_the_event_loop(monkeypatch):
+    import asyncio
+    from types import SimpleNamespace
+
+    from fastapi.testclient import TestClient
+
+    from app.backend.api import app
+    from llms import epic_llm
+
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    monkeypatch.setenv("LLM_SCHEDULER_ENABLED", "false")
+    active = {"now": 0, "peak": 0}
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            chunk_id = kwargs["messages"][0]["content"].split("CHUNK ")[1].split()[0]
+            content = json.dumps([{"epic_name": f"Epic {chunk_id}", "description": "desc", "summary": "s"}])
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+    monkeypatch.setattr(epic_llm, "_get_async_client", lambda: fake_client)
+    monkeypatch.setattr(epic_llm, "generate_epics_prompt", lambda chunk_id, chunk_text: f"CHUNK {chunk_id} {chunk_text}")
+    chunks = [{"chunk_id": f"C{i}", "text": f"requirement {i}"} for i in range(4)]
+
+    response = TestClient(app).post("/async/epics/generate", json={"chunks": chunks})
+
+    assert response.status_code == 200
+    epics = response.json()["epics"]
+    assert [epic["epic_name"] for epic in epics] == ["Epic C0", "Epic C1", "Epic C2", "Epic C3"]
+    assert epics[2]["source_chunk_ids"] == ["C2"]
+    assert active["peak"] > 1
+
+
+def test_epic_stream_emits_chunks_as_they_finish_then_the_merged_plan(monkeypatch):
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    from app.backend.api import app
+    from llms import epic_pipeline
+
+    async def fake_generate(chunk):
+        index = int(chunk["chunk_id"][1:])
+        await asyncio.sleep(0.01 * (3 - index))
+        if index == 1:
+            raise RuntimeError("model unavailable")
+        return [{"epic_name": "Shared", "summary": "Shared", "description": "d", "source_chunk_ids": [chunk["chunk_id"]]}]
+
+    monkeypatch.setattr(epic_pipeline, "generate_epics_from_chunk_async", fake_generate)
+    chunks = [{"chunk_id": f"C{i}", "text": f"requirement {i}"} for i in range(3)]
+
+    response = TestClient(app).post("/epics/generate/stream", json={"chunks": chunks})
+    events = [
+        (block.split("\n")[0].removeprefix("event: "), json.loads(block.split("\n")[1].removeprefix("data: ")))
+        for block in response.text.strip().split("\n\n")
+    ]
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [(name, data.get("chunk_id")) for name, data in events[:-1]] == [
+        ("chunk", "C2"),
+        ("error", "C1"),
+        ("chunk", "C0"),
+    ]
+    name, done = events[-1]
+    assert name == "done"
+    assert done["failed_chunk_ids"] == ["C1"]
+    assert [epic["source_chunk_ids"] for epic in done["epics"]] == [["C0", "C2"]]
+
+
+def test_epic_stream_disconnect_does_not_cancel_calls_shared_with_other_callers(monkeypatch):
+    import asyncio
+
+    from llms import epic_llm, epic_pipeline
+
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    calls = []
+
+    async def scenario():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_complete(prompt, model, max_tokens, temperature):
+            calls.append(prompt)
+            started.set()
+            await release.wait()
+            return '[{"epic_name": "Shared", "summary": "s", "description": "d"}]'
+
+        monkeypatch.setattr(epic_llm, "_complete_with_backoff_async", slow_complete)
+        chunk = {"chunk_id": "C1", "text": "shared requirement"}
+
+        stream = epic_pipeline.iter_chunk_epics_async([chunk])
+        first = asyncio.create_task(stream.__anext__())
+        await started.wait()
+        waiter = asyncio.create_task(epic_llm.generate_epics_from_chunk_async(chunk))
+        await asyncio.sleep(0)
+
+        # the SSE response is cancelled when the browser disconnects
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await stream.aclose()
+        release.set()
+
+        epics = await asyncio.wait_for(waiter, 5)
+        assert [epic["epic_name"] for epic in epics] == ["Shared"]
+        assert epics[0]["source_chunk_ids"] == ["C1"]
+
+    asyncio.run(scenario())
+    assert len(calls) == 1
+
+
+def test_local_json_repair_fixes_common_llm_output_without_a_model_call():
+    from llms.json_repair import repair_stats
+    from llms.parser import parse_llm_json
+
+    before = repair_stats()
+
+    fenced = 'Here you go:\n```json\n{"epics": [{"epic_name": "A", "tags": ["x", "y",],},]}\n```'
+    assert parse_llm_json(fenced) == {"epics": [{"epic_name": "A", "tags": ["x", "y"]}]}
+    assert parse_llm_json("{“epic_name”: “Say \\\"hi\\\"”}") == {"epic_name": 'Say "hi"'}
+    assert parse_llm_json('{"description": "line one\nline two\tend"}') == {"description": "line one\nline two\tend"}
+    assert parse_llm_json('{"epics": [{"epic_name": "A", "description": "cut') == {
+        "epics": [{"epic_name": "A", "description": "cut"}]
+    }
+    assert parse_llm_json('[{"epic_name": "A"}, {"epic_name": "B", "summary":') == [{"epic_name": "A"}, {"epic_name": "B"}]
+    assert parse_llm_json('{"already": "valid"}') == {"already": "valid"}
+
+    after = repair_stats()
+    assert after["repaired"] - before["repaired"] == 5
+    assert after["direct"] - before["direct"] == 1
+    assert after["llm_fallback"] == before["llm_fallback"]
+
+
+def test_epic_generation_only_falls_back_to_llm_repair_when_local_repair_fails(monkeypatch):
+    from llms import epic_llm
+    from llms.json_repair import repair_stats
+
+    repairs = []
+    monkeypatch.setattr(epic_llm, "_chat_with_backoff", lambda *args, **kwargs: '```json\n[{"epic_name": "A", "summary": "s", "description": "d",},]\n```')
+    monkeypatch.setattr(epic_llm, "_repair_json_with_llm", lambda raw: repairs.append(raw) or "[]")
+    before = repair_stats()["llm_fallback"]
+
+    epics = epic_llm.generate_epics_from_chunk({"chunk_id": "C9", "text": "local repair only"})
+
+    assert [epic["epic_name"] for epic in epics] == ["A"]
+    assert repairs == []
+    assert repair_stats()["llm_fallback"] == before
+
+    monkeypatch.setattr(epic_llm, "_chat_with_backoff", lambda *args, **kwargs: "I cannot answer that.")
+    epic_llm.generate_epics_from_chunk({"chunk_id": "C10", "text": "needs the model"})
+
+    assert len(repairs) == 1
+    assert repair_stats()["llm_fallback"] == before + 1
+
+
+def test_llm_stats_endpoint_reports_repair_counters(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    from app.backend.api import app
+    from llms import response_cache
+
+    cache = response_cache.ResponseCache(tmp_path / "llm_cache")
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+
+    response = TestClient(app).get("/llm/stats")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["response_cache"]["entries"] == 0
+    assert not (tmp_path / "llm_cache").exists()
+    assert set(body["json_repair"]) == {"direct", "repaired", "failed", "llm_fallback"}
+    assert "calls" in body["single_flight"]
+
+
+def test_json_repair_ignores_fenced_blocks_inside_string_values():
+    from codegen.code_generator import _parse_code_response
+    from llms.parser import parse_llm_json
+
+    raw = '{"files": {"README.md": "Ports:\n```json\n[8000, 8001]\n```\n"}}'
+
+    assert parse_llm_json(raw) == {"files": {"README.md": "Ports:\n```json\n[8000, 8001]\n```\n"}}
+    assert _parse_code_response(raw) == {"README.md": "Ports:\n```json\n[8000, 8001]\n```\n"}
+    assert parse_llm_json('```json\n{"epics": []}\n```') == {"epics": []}
+
+    fenced = '```json\n{"files": {"README.md": "Run:\\n```bash\\npip install x\\n```\\n", "main.py": "print(1)"}}\n```'
+    expected = {"README.md": "Run:\n```bash\npip install x\n```\n", "main.py": "print(1)"}
+    assert parse_llm_json(fenced) == {"files": expected}
+    assert _parse_code_response(fenced) == expected
@@ -0,0 +1,260 @@
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from ingestion.chunker import chunk_requirements
+from rag import embeddings, encoder_pool, lexical, pipeline, quantize, retriever, vector_store
+from rag.embedding_store import EmbeddingStore
+
+
+class FakeEmbedder:
+    """Deterministic bag-of-words encoder standing in for MiniLM."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, show_progress_bar=False):
+        self.calls.append(list(texts))
+        rows = np.zeros((len(texts), embeddings.EMBEDDING_DIM), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in text.lower().split():
+                slot = int(hashlib.sha1(token.encode("utf-8")).hexdigest(), 16) % embeddings.EMBEDDING_DIM
+                rows[i, slot] += 1.0
+            norm = np.linalg.norm(rows[i])
+            if norm:
+                rows[i] /= norm
+        return rows
+
+
+def _use_fake_embedder(monkeypatch, tmp_path):
+    fake = FakeEmbedder()
+    store = EmbeddingStore(tmp_path / "embeddings", embeddings.EMBEDDING_DIM, capacity=64)
+    monkeypatch.setattr(embeddings, "get_embedder", lambda: fake)
+    monkeypatch.setattr(embeddings, "get_embedding_store", lambda dim: store)
+    monkeypatch.setattr(embeddings, "_memo", type(embeddings._memo)())
+    return fake
+
+
+def test_embed_batches_cache_misses_and_memoizes(monkeypatch, tmp_path):
+    fake = _use_fake_embedder(monkeypatch, tmp_path)
+
+    first = embeddings.embed(["alpha beta", "gamma", "alpha beta"])
+    second = embeddings.embed(["gamma", "delta"])
+
+    assert fake.calls == [["alpha beta", "gamma"], ["delta"]]
+    assert first.shape == (3, embeddings.EMBEDDING_DIM)
+    assert np.allclose(first[0], first[2])
+    assert np.allclose(first[1], second[0])
+
+
+def test_embed_reads_disk_store_before_encoding(monkeypatch, tmp_path):
+    fake = _use_fake_embedder(monkeypatch, tmp_path)
+    expected = embeddings.embed(["order management", "billing"])
+
+    monkeypatch.setattr(embeddings, "_memo", type(embeddings._memo)())
+    reloaded = embeddings.embed(["billing", "order management"])
+
+    assert fake.calls == [["order management", "billing"]]
+    assert np.allclose(reloaded, expected[::-1])
+
+
+def test_embedding_store_evicts_least_recently_used_rows(tmp_path):
+    store = EmbeddingStore(tmp_path / "embeddings", 4, capacity=2)
+    store.put_many({"a": np.ones(4), "b": np.full(4, 2.0)})
+    store.get_many(["a"])
+    store.put_many({"c": np.full(4, 3.0)})
+
+    reopened = EmbeddingStore(tmp_path / "embeddings", 4, capacity=2)
+    found = reopened.get_many(["a", "b", "c"])
+
+    assert sorted(found) == ["a", "c"]
+    assert np.allclose(found["c"], 3.0)
+    assert len(reopened) == 2
+
+
+def test_retrieve_top_k_reuses_document_index_across_queries(monkeypatch, tmp_path):
+    fake = _use_fake_embedder(monkeypatch, tmp_path)
+    monkeypatch.setattr(retriever, "_indexes", type(retriever._indexes)())
+    retriever._query_scores.cache_clear()
+    chunks = [
+        {"chunk_id": "C-1", "text": "users can reset their password"},
+        {"chunk_id": "C-2", "text": "orders are shipped within two days"},
+        {"chunk_id": "C-3", "text": "invoices are emailed to customers"},
+    ]
+
+    first = retriever.retrieve_top_k(chunks, "password reset", k=1)
+    second = retriever.retrieve_top_k(chunks, "shipped orders", k=2)
+
+    assert [c["chunk_id"] for c in first] == ["C-1"]
+    assert second[0]["chunk_id"] == "C-2"
+    assert len(second) == 2
+    assert sum(len(call) for call in fake.calls) == 5
+
+
+def test_hnsw_backend_persists_and_matches_flat_search(monkeypatch, tmp_path):
+    monkeypatch.setattr(vector_store, "RAG_INDEX_DIR", tmp_path / "indexes")
+    rng = np.random.default_rng(3)
+    matrix = rng.standard_normal((200, 16)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    flat = vector_store.build_index(matrix, backend="flat")
+    hnsw = vector_store.build_index(matrix, backend="hnsw", signature="doc")
+    reloaded = vector_store.build_index(matrix, backend="hnsw", signature="doc")
+
+    _, exact = flat.search(matrix[:5], 3)
+    _, approx = reloaded.search(matrix[:5], 3)
+    assert (tmp_path / "indexes" / "doc.hnsw").exists()
+    assert isinstance(hnsw, vector_store.HNSWBackend)
+    assert exact[:, 0].tolist() == [0, 1, 2, 3, 4]
+    assert approx[:, 0].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_automatic_backend_stays_flat_until_ann_threshold_is_set(monkeypatch):
+    matrix = np.eye(8, dtype=np.float32)
+
+    assert vector_store.RAG_ANN_THRESHOLD == 0
+    assert vector_store.build_index(matrix).name == "flat"
+
+    monkeypatch.setattr(vector_store, "RAG_ANN_THRESHOLD", 8)
+    expected = "hnsw" if vector_store.ann_available() else "flat"
+    assert vector_store.build_index(matrix).name == expected
+
+
+def test_retrieve_top_k_batch_embeds_all_queries_together(monkeypatch, tmp_path):
+    fake = _use_fake_embedder(monkeypatch, tmp_path)
+    monkeypatch.setattr(retriever, "_indexes", type(retriever._indexes)())
+    chunks = [
+        {"chunk_id": "C-1", "text": "users can reset their password"},
+        {"chunk_id": "C-2", "text": "orders are shipped within two days"},
+        {"chunk_id": "C-3", "text": "invoices are emailed to customers"},
+    ]
+
+    results = retriever.retrieve_top_k_batch(chunks, ["Password Reset", "invoices emailed", "orders shipped"], k=1)
+
+    assert [[c["chunk_id"] for c in row] for row in results] == [["C-1"], ["C-3"], ["C-2"]]
+    assert fake.calls[-1] == ["password reset", "invoices emailed", "orders shipped"]
+
+
+def test_chunker_terms_feed_bm25_and_hybrid_weights(monkeypatch, tmp_path):
+    _use_fake_embedder(monkeypatch, tmp_path)
+    monkeypatch.setattr(retriever, "_indexes", type(retriever._indexes)())
+    chunks = chunk_requirements("Users sign in with SSO.\nOrder management lets staff edit an order.\nReports export to CSV.", max_lines=1)
+
+    assert chunks[1]["terms"]["order"] == 2
+    bm25 = lexical.LexicalIndex.from_chunks(chunks).scores("Order Management")
+    assert int(np.argmax(bm25)) == 1
+
+    ranked = retriever.retrieve_top_k(chunks, "order management", k=1, dense_weight=0.0, lexical_weight=1.0)
+    assert ranked == [chunks[1]]
+
+    index = retriever.ChunkIndex(
+        "hybrid-hnsw",
+        tuple(c["chunk_id"] for c in chunks),
+        embeddings.embed(c["text"] for c in chunks),
+        lexical=lexical.LexicalIndex.from_chunks(chunks),
+        backend="flat",
+    )
+    monkeypatch.setattr(vector_store, "RAG_INDEX_DIR", tmp_path / "indexes")
+    index.backend = vector_store.build_index(index.vectors, backend="hnsw")
+    hits = index.search(embeddings.embed(["reports csv"])[0], 2, "reports csv")
+    assert hits[0][0] == chunks[2]["chunk_id"]
+
+
+def test_assemble_context_packs_relevant_chunks_under_budget(monkeypatch, tmp_path):
+    _use_fake_embedder(monkeypatch, tmp_path)
+    monkeypatch.setattr(retriever, "_indexes", type(retriever._indexes)())
+    chunks = [
+        {"chunk_id": "C-1", "text": "Customers pay invoices online with a saved card"},
+        {"chunk_id": "C-2", "text": "Admins manage user roles and permissions"},
+        {"chunk_id": "C-3", "text": "Invoices list overdue payments for customers"},
+    ]
+
+    context = pipeline.assemble_context(chunks, query="customer invoices", token_budget=20)
+
+    assert context["chunk_ids"] == ["C-1", "C-3"]
+    assert context["tokens"] <= 20
+    assert context["saved_tokens"] == context["total_tokens"] - context["tokens"] > 0
+    assert pipeline.build_rag_context(["a b", "c d"], token_budget=2) == "a b"
+
+
+def test_packed_storage_tracks_float32_scores():
+    rng = np.random.default_rng(11)
+    matrix = rng.standard_normal((500, embeddings.EMBEDDING_DIM)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    queries = matrix[:20] + 0.05 * rng.standard_normal((20, embeddings.EMBEDDING_DIM)).astype(np.float32)
+
+    half = quantize.storage_accuracy(matrix, queries, "float16")
+    int8 = quantize.storage_accuracy(matrix, queries, "int8")
+
+    assert half["max_abs_error"] < 1e-3 and half["bytes_ratio"] == 0.5
+    assert int8["max_abs_error"] < 2e-2 and int8["bytes_ratio"] < 0.3
+    assert half["recall_at_k"] >= 0.98
+    assert int8["recall_at_k"] >= 0.9
+
+
+def test_large_miss_batches_go_to_encoder_pool(monkeypatch, tmp_path):
+    fake = _use_fake_embedder(monkeypatch, tmp_path)
+
+    class FakePool:
+        def __init__(self):
+            self.batches = []
+
+        def encode(self, texts, batch_size):
+            self.batches.append(list(texts))
+            return fake.encode(texts)
+
+    pool = FakePool()
+    monkeypatch.setattr(embeddings, "EMBED_POOL_MIN_BATCH", 3)
+    monkeypatch.setattr(embeddings, "get_encoder_pool", lambda model_name, dim: pool)
+
+    embeddings.embed(["one", "two"])
+    embeddings.embed(["three", "four", "five"])
+
+    assert pool.batches == [["three", "four", "five"]]
+    assert encoder_pool._shard_bounds(10, 4) == [(0, 3), (3, 6), (6, 8), (8, 10)]
+
+
+def test_broken_encoder_pool_is_reset_and_batch_encoded_in_process(monkeypatch, tmp_path):
+    from concurrent.futures.process import BrokenProcessPool
+
+    fake = _use_fake_embedder(monkeypatch, tmp_path)
+
+    class BrokenPool:
+        shut_down = False
+
+        def encode(self, texts, batch_size):
+            raise BrokenProcessPool("a worker died")
+
+        def shutdown(self):
+            self.shut_down = True
+
+    pool = BrokenPool()
+    monkeypatch.setattr(embeddings, "EMBED_POOL_MIN_BATCH", 2)
+    monkeypatch.setattr(encoder_pool, "EMBED_POOL_WORKERS", 2)
+    monkeypatch.setattr(encoder_pool, "_pool", pool)
+
+    vectors = embeddings.embed(["alpha", "beta"])
+
+    assert fake.calls == [["alpha", "beta"]]
+    assert vectors.shape == (2, embeddings.EMBEDDING_DIM)
+    assert pool.shut_down
+    assert encoder_pool._pool is None
+
+
+def test_embedder_import_failure_is_reported_in_status(monkeypatch):
+    import pytest
+
+    monkeypatch.setattr(embeddings, "_model", None)
+    monkeypatch.setattr(embeddings, "_model_error", "")
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+
+    with pytest.raises(ImportError):
+        embeddings.get_embedder()
+
+    status = embeddings.embedder_status()
+    assert status["ready"] is False
+    assert "sentence_transformers" in status["error"]
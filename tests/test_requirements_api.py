@@ -0,0 +1,146 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app.backend import api, services
+from ingestion.chunker import chunk_requirements
+
+
+client = TestClient(api.app)
+REQUIREMENTS = "Epic: Accounts\nUsers register\nUsers log in\nModule: Billing\nUsers pay invoices\n"
+
+
+def test_parse_stream_emits_ndjson_chunks_then_done():
+    response = client.post("/requirements/parse/stream", files={"file": ("spec.txt", REQUIREMENTS.encode("utf-8"))})
+    events = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [e["chunk"] for e in events[:-1]] == chunk_requirements(REQUIREMENTS)
+    assert events[-1] == {"type": "done", "filename": "spec.txt", "chunk_count": 3}
+
+
+def test_parse_stream_rejects_unsupported_format():
+    response = client.post("/requirements/parse/stream", files={"file": ("spec.docx", b"x")})
+
+    assert response.status_code == 400
+
+
+def test_parse_serves_repeat_uploads_from_cache(monkeypatch, tmp_path):
+    from app.backend import parse_cache
+
+    monkeypatch.setenv("PARSE_CACHE_ENABLED", "true")
+    monkeypatch.setattr(parse_cache, "_cache", parse_cache.ParseCache(tmp_path, max_entries=2))
+    loads = []
+    real_load = api.load_requirements
+    monkeypatch.setattr(api, "load_requirements", lambda *a, **kw: loads.append(1) or real_load(*a, **kw))
+    upload = {"file": ("spec.txt", REQUIREMENTS.encode("utf-8"))}
+
+    first = client.post("/requirements/parse", files=upload).json()
+    second = client.post("/requirements/parse", files=upload).json()
+    other_settings = client.post("/requirements/parse", files=upload, data={"max_tokens": "20"}).json()
+
+    assert len(loads) == 2
+    assert (first["cache"], second["cache"], other_settings["cache"]) == ("miss", "hit", "miss")
+    assert second["chunks"] == first["chunks"]
+    assert second["requirements_text"] == first["requirements_text"]
+    stats = client.get("/requirements/parse/cache").json()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    from app.backend.parse_cache import ParseCache
+
+    cache = ParseCache(tmp_path, max_entries=2)
+    cache.put("a", {"chunks": []})
+    cache.put("b", {"chunks": []})
+    os.utime(tmp_path / "a.json", (1, 1))
+    os.utime(tmp_path / "b.json", (2, 2))
+    assert cache.get("a") == {"chunks": []}
+    cache.put("c", {"chunks": []})
+
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["a", "c"]
+
+
+def test_rebuild_workspace_plan_regenerates_only_changed_chunks(monkeypatch):
+    saved_chunks = [{"chunk_id": "C-keep", "text": "keep"}, {"chunk_id": "C-gone", "text": "gone"}]
+    saved_epics = [
+        {
+            "epic_name": "Accounts",
+            "summary": "Accounts",
+            "source_chunk_ids": ["C-keep", "C-gone"],
+            "stories": [
+                {"epic_name": "Accounts", "summary": "Log in", "source_chunk_id": "C-keep"},
+                {"epic_name": "Accounts", "summary": "Reset password", "source_chunk_id": "C-gone"},
+            ],
+        },
+        {
+            "epic_name": "Legacy",
+            "summary": "Legacy",
+            "source_chunk_ids": ["C-gone"],
+            "stories": [{"epic_name": "Legacy", "summary": "Old", "source_chunk_id": "C-gone"}],
+        },
+    ]
+    monkeypatch.setattr(
+        services,
+        "load_workspace",
+        lambda workspace_id: {"workspace_id": workspace_id, "chunks": saved_chunks, "epics": saved_epics},
+    )
+    epic_calls, story_calls = [], []
+
+    def fake_epics(chunks):
+        epic_calls.append([chunk["chunk_id"] for chunk in chunks])
+        return [
+            {"epic_name": "Accounts", "summary": "Accounts", "source_chunk_ids": ["C-new"]},
+            {"epic_name": "Billing", "summary": "Billing", "source_chunk_ids": ["C-new"]},
+        ]
+
+    def fake_stories(epic, chunk):
+        story_calls.append((epic["epic_name"], chunk["chunk_id"]))
+        return [{"epic_name": epic["epic_name"], "summary": f"{epic['epic_name']} new", "source_chunk_id": chunk["chunk_id"]}]
+
+    monkeypatch.setattr(services, "generate_epics_from_requirements", fake_epics)
+    monkeypatch.setattr(services, "generate_stories_from_chunk", fake_stories)
+
+    result = services.rebuild_workspace_plan(
+        "ws", [{"chunk_id": "C-keep", "text": "keep"}, {"chunk_id": "C-new", "text": "new"}]
+    )
+
+    assert result["added_chunk_ids"] == ["C-new"]
+    assert result["removed_chunk_ids"] == ["C-gone"]
+    assert result["unchanged_chunk_count"] == 1
+    assert epic_calls == [["C-new"]]
+    assert story_calls == [("Accounts", "C-new"), ("Billing", "C-new")]
+    assert [epic["epic_name"] for epic in result["epics"]] == ["Accounts", "Billing"]
+    assert result["removed_epics"] == ["Legacy"]
+    assert result["affected_epics"] == ["Accounts", "Billing"]
+    accounts = result["epics"][0]
+    assert accounts["source_chunk_ids"] == ["C-keep", "C-new"]
+    assert [story["summary"] for story in accounts["stories"]] == ["Log in", "Accounts new"]
+
+
+def test_diff_endpoint_parses_upload_and_rebuilds_workspace(monkeypatch):
+    calls = []
+
+    def fake_rebuild(workspace_id, chunks, regenerate=True, save=False, requirements_filename=""):
+        calls.append((workspace_id, [chunk["chunk_id"] for chunk in chunks], regenerate, requirements_filename))
+        return {"workspace_id": workspace_id, "added_chunk_ids": []}
+
+    monkeypatch.setattr(api, "get_parse_cache", lambda: None)
+    monkeypatch.setattr(services, "rebuild_workspace_plan", fake_rebuild)
+
+    response = client.post(
+        "/workspaces/ws-1/diff",
+        files={"file": ("spec.txt", REQUIREMENTS.encode("utf-8"), "text/plain")},
+        data={"regenerate": "false"},
+    )
+
+    assert response.status_code == 200
+    expected_ids = [chunk["chunk_id"] for chunk in chunk_requirements(REQUIREMENTS, max_tokens=api.CHUNK_MAX_TOKENS)]
+    assert calls == [("ws-1", expected_ids, False, "spec.txt")]